@@ -5,6 +5,7 @@ Run this once to authenticate your Telegram account for Premium emoji support
 """
 
 import asyncio
+import sys
 from telegram_nft_monitor import TelegramNFTMonitor
 
 async def authenticate_telegram():
@@ -18,12 +19,26 @@ async def authenticate_telegram():
     if success:
         print("\n✅ Authentication successful!")
         print("🎁 Premium animated emojis are now enabled")
-        print("🚀 You can now run the main monitor: python telegram_nft_monitor.py")
     else:
         print("\n❌ Authentication failed")
         print("📱 The monitor will use standard emojis as fallback")
     
+    # Capture a Portals token now so the monitor starts without opening the browser
+    print("\n🔑 Capturing Portals Market token...")
+    # A freshly extracted token is cached by ensure_valid_token itself
+    if await monitor.ensure_valid_token():
+        print("💾 Token ready - the monitor will reuse it on startup")
+    else:
+        print("⚠️ Could not capture a token; the monitor will try again on startup")
+    
+    if success:
+        print("🚀 You can now run the main monitor: python telegram_nft_monitor.py")
+    
     await monitor.cleanup()
 
 if __name__ == "__main__":
-    asyncio.run(authenticate_telegram())
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.run(authenticate_telegram())
+    else:
+        asyncio.run(authenticate_telegram())
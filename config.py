@@ -1,96 +1,182 @@
 # =============================================================================
 # PORTALS NFT MONITOR - SIMPLIFIED CONFIGURATION
 # =============================================================================
-
-# =============================================================================
-# TELEGRAM BOT SETTINGS
-# =============================================================================
-# Get bot token from @BotFather on Telegram
-BOT_TOKEN = "YOUR BOT TOKEN HERE"  # Replace with your bot token from @BotFather
-
-# =============================================================================
-# CHANNEL SETTINGS
-# =============================================================================
-# Primary channel for notifications
-CHANNEL_USERNAME = "@YOUR CHANNEL USERNAME HERE"
-
-# =============================================================================
-# PORTALS MARKET API SETTINGS
-# =============================================================================
-PORTALS_API_URL = "https://portals-market.com/api/market/actions/"
-PORTALS_CHANNEL_URL = "https://web.telegram.org/k/#@portals"
-PORTALS_MARKET_ACTIVITY_URL = "https://portals-market.com/market-activity"
-
-# =============================================================================
-# RATE LIMITING & SECURITY SETTINGS
-# =============================================================================
-# Message sending delays (to avoid bans)
-MESSAGE_DELAY = 3           # seconds between messages (reduced for faster notifications)
-BATCH_DELAY = 10            # seconds between batches of messages (reduced)
-MAX_MESSAGES_PER_MINUTE = 8   # maximum messages per minute (increased slightly)
-MAX_MESSAGES_PER_HOUR = 150   # maximum messages per hour (increased)
-
-# API request settings
-CHECK_INTERVAL = 5          # seconds between API checks (much faster for real-time)
-REQUEST_TIMEOUT = 15        # seconds for API requests (reduced)
-RETRY_ATTEMPTS = 2          # number of retry attempts (reduced for speed)
-
-# Token refresh settings
-TOKEN_REFRESH_INTERVAL = 3600  # 60 minutes (increased to avoid frequent refreshes)
-TOKEN_MAX_AGE = 7200          # 2 hours maximum token age (increased)
-
-# =============================================================================
-# DUPLICATE DETECTION & PRICE TRACKING
-# =============================================================================
-# Track price changes for the same NFT
-TRACK_PRICE_CHANGES = True
-PRICE_CHANGE_THRESHOLD = 0.01  # Minimum price difference to consider as new sale (TON)
-
-# How long to remember previous sales (to detect duplicates)
-DUPLICATE_MEMORY_HOURS = 24    # 24 hours
-
-# =============================================================================
-# MESSAGE FORMATTING SETTINGS
-# =============================================================================
-# Custom emojis for different price ranges
-
-
-# Special notifications for high-value sales
-HIGH_VALUE_THRESHOLD = 50.0    # TON
-ULTRA_VALUE_THRESHOLD = 200.0  # TON
-
-# Pin messages for high-value purchases
-PIN_MESSAGE_THRESHOLD = 100.0  # TON - Pin messages for purchases above this amount
-
-# =============================================================================
-# BROWSER AUTOMATION SETTINGS
-# =============================================================================
-BROWSER_HEADLESS = False       # Keep browser visible for debugging
-BROWSER_TIMEOUT = 60000        # 60 seconds
-BROWSER_USER_DATA_DIR = "browser_data"
-
-# =============================================================================
-# LOGGING SETTINGS
-# =============================================================================
-LOG_LEVEL = "INFO"
-LOG_FILE = "nft_monitor.log"
-LOG_MAX_SIZE_MB = 10
-LOG_BACKUP_COUNT = 5
-
-# =============================================================================
-# SAFETY FEATURES
-# =============================================================================
-# Emergency stop settings
-MAX_CONSECUTIVE_FAILURES = 10
-EMERGENCY_COOLDOWN = 300      # 5 minutes cooldown on emergency stop
-
-# Monitoring limits
-MAX_DAILY_MESSAGES = 2000     # Maximum messages per day
-DAILY_RESET_HOUR = 0          # Hour to reset daily counters (0 = midnight)
-
-# =============================================================================
-# DEVELOPMENT/DEBUG SETTINGS
-# =============================================================================
-DEBUG_MODE = False
-SAVE_RAW_API_RESPONSES = False
-VERBOSE_LOGGING = True
+# Edit the values in the Config class below. Settings are frozen at import
+# and validated once; import CFG to read them.
+
+from dataclasses import dataclass
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    # =============================================================================
+    # TELEGRAM BOT SETTINGS
+    # =============================================================================
+    # Get bot token from @BotFather on Telegram
+    BOT_TOKEN: str = "YOUR BOT TOKEN HERE"  # Replace with your bot token from @BotFather
+
+    # =============================================================================
+    # CHANNEL SETTINGS
+    # =============================================================================
+    # Primary channel for notifications
+    CHANNEL_USERNAME: str = "@YOUR CHANNEL USERNAME HERE"
+
+    # =============================================================================
+    # TELEGRAM USER CLIENT (MTPROTO) SETTINGS
+    # =============================================================================
+    # Get api_id / api_hash from https://my.telegram.org
+    # Run authenticate_telegram.py once to create the session file
+    TELEGRAM_API_ID: int = 0                       # Replace with your api_id
+    TELEGRAM_API_HASH: str = "YOUR API HASH HERE"  # Replace with your api_hash
+    TELEGRAM_SESSION_NAME: str = "portals_monitor" # Session file name (portals_monitor.session)
+
+    # New posts in this channel trigger an immediate API check
+    PORTALS_EVENT_CHANNEL: str = "portals"
+
+    # =============================================================================
+    # PORTALS MARKET API SETTINGS
+    # =============================================================================
+    PORTALS_API_URL: str = "https://portals-market.com/api/market/actions/"
+    PORTALS_CHANNEL_URL: str = "https://web.telegram.org/k/#@portals"
+    PORTALS_MARKET_ACTIVITY_URL: str = "https://portals-market.com/market-activity"
+
+    # =============================================================================
+    # RATE LIMITING & SECURITY SETTINGS
+    # =============================================================================
+    # Message sending delays (to avoid bans)
+    MESSAGE_DELAY: int = 3           # seconds between messages (reduced for faster notifications)
+    BATCH_DELAY: int = 10            # seconds between batches of messages (reduced)
+    MAX_MESSAGES_PER_MINUTE: int = 8   # maximum messages per minute (increased slightly)
+    MAX_MESSAGES_PER_HOUR: int = 150   # maximum messages per hour (increased)
+    MAX_MTPROTO_MESSAGES_PER_MINUTE: int = 30  # per-minute cap when sending through the user client
+    SEND_QUEUE_SIZE: int = 1000      # notifications waiting for the sender before producers block
+    BATCH_THRESHOLD: int = 3         # more new sales than this in one check are sent as digests
+    DIGEST_MAX_SALES: int = 10       # maximum sales combined into one digest message
+
+    # API request settings
+    CHECK_INTERVAL: int = 5          # starting seconds between API checks when polling (no user client or DEBUG_MODE)
+    POLL_MIN_INTERVAL: float = 1.0   # polling speeds up towards this while new sales keep arriving...
+    POLL_MAX_INTERVAL: float = 30.0  # ...and slows down towards this while the market is quiet
+    EVENT_FALLBACK_INTERVAL: int = 60  # seconds - poll anyway if no channel event arrives (recovers missed events)
+    REQUEST_TIMEOUT: int = 15        # seconds for API requests (reduced)
+    RETRY_ATTEMPTS: int = 2          # number of retry attempts (reduced for speed)
+
+    # Token refresh settings
+    TOKEN_REFRESH_INTERVAL: int = 3600  # 60 minutes (increased to avoid frequent refreshes)
+    TOKEN_MAX_AGE: int = 7200          # 2 hours maximum token age (increased)
+    SESSION_CACHE_PATH: str = "~/.portals_monitor/session.json"  # token shared with the next run (reused within TOKEN_MAX_AGE)
+
+    # =============================================================================
+    # DUPLICATE DETECTION & PRICE TRACKING
+    # =============================================================================
+    # Track price changes for the same NFT
+    TRACK_PRICE_CHANGES: bool = True
+    PRICE_CHANGE_THRESHOLD: float = 0.01  # Minimum price difference to consider as new sale (TON)
+
+    # How long to remember previous sales (to detect duplicates)
+    DUPLICATE_MEMORY_HOURS: int = 24    # 24 hours
+
+    # Sliding-window Bloom filter for duplicate sales (fixed memory regardless of sale volume)
+    DUPLICATE_FILTER_K: int = 4              # sub-filters, the oldest is cleared every DUPLICATE_MEMORY_HOURS / K
+    DUPLICATE_FILTER_CAPACITY: int = 20000   # sales per sub-filter
+    DUPLICATE_FILTER_ERROR_RATE: float = 0.001 # false-positive rate per sub-filter
+    DUPLICATE_LRU_SIZE: int = 10000          # most recent NFTs checked exactly before the filter
+
+    # Seen API action ids (same sliding window, exact LRU for the hot window)
+    SEEN_FILTER_CAPACITY: int = 10000        # action ids per sub-filter
+    SEEN_FILTER_ERROR_RATE: float = 0.0001   # false-positive rate per sub-filter
+    SEEN_LRU_SIZE: int = 2048                # most recent action ids checked exactly
+
+    # State persistence: snapshot file plus an append-only journal of changes
+    STATE_COMPACT_EVERY: int = 1000          # journal records before the snapshot is rewritten
+    STATE_JOURNAL_MAX_BYTES: int = 1048576   # or when the journal grows past this size (1 MB)
+
+    # =============================================================================
+    # MESSAGE FORMATTING SETTINGS
+    # =============================================================================
+    # Custom emojis for different price ranges, indexed by tier (normal, high, pin, ultra)
+    STD_EMOJI_BY_TIER: tuple[str, ...] = ("💰", "🔥", "💎", "🚀")
+    # Premium custom emoji ids per tier, used when sending through the user client
+    # (leave empty to always use the standard emojis)
+    PREMIUM_EMOJI_BY_TIER: tuple[str, ...] = ()
+
+    # Special notifications for high-value sales
+    HIGH_VALUE_THRESHOLD: float = 50.0    # TON
+    ULTRA_VALUE_THRESHOLD: float = 200.0  # TON
+
+    # Message header per price tier
+    SALE_HEADER: str = "🎉 GIFT SOLD!"
+    HIGH_VALUE_SALE_HEADER: str = "💎 HIGH VALUE GIFT SOLD!"     # >= HIGH_VALUE_THRESHOLD
+    ULTRA_VALUE_SALE_HEADER: str = "🚀 ULTRA VALUE GIFT SOLD!"   # >= ULTRA_VALUE_THRESHOLD
+
+    # Pin messages for high-value purchases
+    PIN_MESSAGE_THRESHOLD: float = 100.0  # TON - Pin messages for purchases above this amount
+
+    # =============================================================================
+    # BROWSER AUTOMATION SETTINGS
+    # =============================================================================
+    BROWSER_HEADLESS: bool = False       # Keep browser visible for debugging
+    BROWSER_TIMEOUT: int = 60000        # 60 seconds, first navigation with a fresh profile
+    BROWSER_NAV_TIMEOUT: int = 15000    # 15 seconds, other navigations
+    BROWSER_ACTION_TIMEOUT: int = 3000  # 3 seconds, clicks and selector waits
+    BROWSER_USER_DATA_DIR: str = "browser_data"
+    BROWSER_STORAGE_STATE: str = "storage_state.json"  # Login snapshot used if browser_data is lost
+    # Linux only: run the profile from /dev/shm for faster launches. Costs RAM for the profile
+    # size and is copied back to BROWSER_USER_DATA_DIR on close; a reboot before that loses the changes.
+    BROWSER_PROFILE_IN_RAM: bool = False
+    BROWSER_BLOCK_RESOURCES: bool = True  # Abort images, fonts, CSS, media and trackers during extraction
+    TOKEN_EXTRACT_TIMEOUT: int = 600    # Kill the extractor subprocess after 10 minutes
+
+    # =============================================================================
+    # LOGGING SETTINGS
+    # =============================================================================
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "nft_monitor.log"
+    LOG_MAX_SIZE_MB: int = 10
+    LOG_BACKUP_COUNT: int = 5
+
+    # =============================================================================
+    # SAFETY FEATURES
+    # =============================================================================
+    # Emergency stop settings
+    MAX_CONSECUTIVE_FAILURES: int = 10
+    EMERGENCY_COOLDOWN: int = 300      # 5 minutes cooldown on emergency stop
+
+    # Monitoring limits
+    MAX_DAILY_MESSAGES: int = 2000     # Maximum messages per day
+    DAILY_RESET_HOUR: int = 0          # Hour to reset daily counters (0 = midnight)
+
+    # =============================================================================
+    # DEVELOPMENT/DEBUG SETTINGS
+    # =============================================================================
+    DEBUG_MODE: bool = False
+    SAVE_RAW_API_RESPONSES: bool = False
+
+    def __post_init__(self):
+        """Validate settings once at import time"""
+        positive = ('CHECK_INTERVAL', 'EVENT_FALLBACK_INTERVAL', 'REQUEST_TIMEOUT', 'RETRY_ATTEMPTS',
+                    'TOKEN_REFRESH_INTERVAL', 'MAX_MESSAGES_PER_MINUTE', 'MAX_MESSAGES_PER_HOUR',
+                    'MAX_MTPROTO_MESSAGES_PER_MINUTE', 'SEND_QUEUE_SIZE', 'DUPLICATE_MEMORY_HOURS',
+                    'DUPLICATE_FILTER_K', 'DUPLICATE_FILTER_CAPACITY', 'DUPLICATE_LRU_SIZE',
+                    'SEEN_FILTER_CAPACITY', 'SEEN_LRU_SIZE', 'PRICE_CHANGE_THRESHOLD',
+                    'BATCH_THRESHOLD', 'DIGEST_MAX_SALES', 'STATE_COMPACT_EVERY',
+                    'STATE_JOURNAL_MAX_BYTES', 'POLL_MIN_INTERVAL', 'POLL_MAX_INTERVAL',
+                    'TOKEN_EXTRACT_TIMEOUT', 'BROWSER_TIMEOUT', 'BROWSER_NAV_TIMEOUT',
+                    'BROWSER_ACTION_TIMEOUT')
+        for name in positive:
+            if getattr(self, name) <= 0:
+                raise ValueError(f"config: {name} must be greater than 0")
+        if not self.POLL_MIN_INTERVAL <= self.POLL_MAX_INTERVAL:
+            raise ValueError("config: POLL_MIN_INTERVAL must not exceed POLL_MAX_INTERVAL")
+        if not 0 < self.DUPLICATE_FILTER_ERROR_RATE < 1:
+            raise ValueError("config: DUPLICATE_FILTER_ERROR_RATE must be between 0 and 1")
+        if not 0 < self.SEEN_FILTER_ERROR_RATE < 1:
+            raise ValueError("config: SEEN_FILTER_ERROR_RATE must be between 0 and 1")
+        if not self.HIGH_VALUE_THRESHOLD <= self.PIN_MESSAGE_THRESHOLD <= self.ULTRA_VALUE_THRESHOLD:
+            raise ValueError("config: price tiers must satisfy "
+                             "HIGH_VALUE_THRESHOLD <= PIN_MESSAGE_THRESHOLD <= ULTRA_VALUE_THRESHOLD")
+        if len(self.STD_EMOJI_BY_TIER) != 4 or len(self.PREMIUM_EMOJI_BY_TIER) not in (0, 4):
+            raise ValueError("config: emoji tuples must have one entry per price tier (4)")
+        if self.LOG_LEVEL not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+            raise ValueError(f"config: unknown LOG_LEVEL {self.LOG_LEVEL!r}")
+
+CFG = Config()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Portals Market token extractor
+Opens Telegram Web with Playwright, captures the TMA authorization header sent to
+portals-market.com and prints it to stdout. The monitor runs this as a short-lived
+subprocess so Chromium only occupies memory while a token is being extracted.
+"""
+
+import asyncio
+import logging
+import orjson
+import os
+import re
+import shutil
+import sys
+import time
+from typing import Optional
+from playwright.async_api import async_playwright, BrowserContext, Page
+from config import CFG
+
+# The monitor decodes our stderr as UTF-8, emoji included
+if sys.platform == "win32":
+    sys.stderr.reconfigure(encoding="utf-8")
+
+# stdout carries the token only; all logging goes to stderr, where the monitor
+# reads 'LEVEL:message' lines and re-logs them into its own log file
+logging.basicConfig(
+    level=getattr(logging, CFG.LOG_LEVEL),
+    format='%(levelname)s:%(message)s',
+    stream=sys.stderr
+)
+logger = logging.getLogger(__name__)
+
+# Requests that never carry the token and only slow page loads down
+BLOCKED_ASSETS = re.compile(r"\.(png|jpg|jpeg|gif|webp|woff2?|ttf|css|mp4)(\?|$)")
+BLOCKED_TRACKERS = re.compile(r"(fonts\.|googletagmanager|google-analytics|doubleclick|cdn\.segment\.(com|io)|api\.segment\.io|hotjar|sentry)")
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--start-maximized',  # Start maximized
+    '--disable-infobars',
+    '--disable-notifications'
+]
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+PORTALS_MARKET_URL = re.compile(r"portals-market\.com")
+API_ACTIONS_URL = re.compile(r"portals-market\.com/api/.*actions")  # the calls that carry the token
+TMA_AUTH = re.compile(r"tma |query_id=")
+
+# Fills in localStorage keys from the storage-state snapshot that the new profile does not have yet
+RESTORE_LOCAL_STORAGE_JS = """(origins => {
+    const saved = origins[location.origin];
+    if (!saved) return;
+    for (const [name, value] of Object.entries(saved)) {
+        if (localStorage.getItem(name) === null) localStorage.setItem(name, value);
+    }
+})"""
+
+RAM_DIR = '/dev/shm'
+
+def ram_profile_dir() -> Optional[str]:
+    """Profile location on tmpfs if BROWSER_PROFILE_IN_RAM is set and /dev/shm is usable"""
+    if not CFG.BROWSER_PROFILE_IN_RAM or sys.platform != 'linux':
+        return None
+    if not (os.path.isdir(RAM_DIR) and os.access(RAM_DIR, os.W_OK)):
+        return None
+    return os.path.join(RAM_DIR, os.path.basename(CFG.BROWSER_USER_DATA_DIR.rstrip('/')))
+
+def _mirror_dir(src: str, dest: str):
+    """Replace dest with a copy of src; the old copy is only removed once the new one is complete"""
+    tmp, old = dest + '.tmp', dest + '.old'
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.copytree(src, tmp, symlinks=True, ignore=shutil.ignore_patterns('Singleton*'))
+    if os.path.exists(dest):
+        os.replace(dest, old)
+    os.replace(tmp, dest)
+    shutil.rmtree(old, ignore_errors=True)
+
+def _write_private_file(path: str, data: bytes):
+    """Write a file holding login data, readable by the owner only"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)
+    with open(fd, 'wb') as f:
+        f.write(data)
+
+async def _abort_route(route):
+    await route.abort()
+
+class PortalsTokenExtractor:
+    """Drives a persistent Chromium profile until a Portals API request reveals the token"""
+
+    def __init__(self):
+        self.playwright = None
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+        self.auth_token: Optional[str] = None
+        self._token_event = asyncio.Event()  # set by _on_request once a token is captured
+        self._cold_start = False            # profile directory was just created
+        self._ram_profile: Optional[str] = None  # tmpfs copy of the profile, synced back on close
+
+    def _on_context_close(self, _context):
+        logger.warning("⚠️ Browser context was closed")
+        self.context = self.page = None
+
+    async def setup_browser(self) -> bool:
+        """Initialize Playwright browser for token extraction (no-op while the context is open)"""
+        if self.context:
+            return True
+
+        try:
+            logger.info("🌐 Setting up browser for token extraction...")
+            if not self.playwright:
+                self.playwright = await async_playwright().start()
+
+            # Use persistent browser data to avoid logout
+            user_data_dir = os.path.join(os.getcwd(), CFG.BROWSER_USER_DATA_DIR)
+            self._cold_start = not os.path.isdir(user_data_dir)
+            os.makedirs(user_data_dir, exist_ok=True)
+            profile_dir = user_data_dir
+            ram_dir = ram_profile_dir()
+            if ram_dir:
+                # Chromium reads thousands of small profile files at launch; serve them from RAM.
+                # A copy left by an earlier run this boot is newer than (or equal to) the disk one.
+                if not os.path.isdir(ram_dir):
+                    await asyncio.to_thread(_mirror_dir, user_data_dir, ram_dir)
+                self._ram_profile = profile_dir = ram_dir
+                logger.info(f"⚡ Using RAM-backed browser profile: {ram_dir}")
+
+            # Launch browser with persistent session; the context is the browser itself
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                user_data_dir=profile_dir,
+                headless=CFG.BROWSER_HEADLESS,
+                args=BROWSER_ARGS,
+                user_agent=USER_AGENT,
+                viewport={'width': 1920, 'height': 1080},
+                ignore_default_args=['--enable-automation']  # Remove automation indicators
+            )
+
+            if self._cold_start and os.path.exists(CFG.BROWSER_STORAGE_STATE):
+                # Profile is gone but a login snapshot survives; seed the new profile with it
+                logger.info("📁 Browser profile missing, restoring session from storage state")
+                await self.restore_storage_state()
+
+            self.context.on('close', self._on_context_close)
+
+            # Tokens are read from requests as they go out; routes are only used to block resources
+            self.context.on('request', self._on_request)
+            # A fresh profile may need a human to log in, so leave styles and images alone then
+            if CFG.BROWSER_BLOCK_RESOURCES and not self._cold_start:
+                await self.context.route(BLOCKED_ASSETS, _abort_route)
+                await self.context.route(BLOCKED_TRACKERS, _abort_route)
+
+            logger.info("✅ Browser setup completed - Chrome should be fully visible")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Failed to setup browser: {e}")
+            return False
+
+    async def _on_request(self, request):
+        """Watch outgoing requests (passively, no route round trip) to capture authorization tokens"""
+        if not API_ACTIONS_URL.search(request.url):
+            return
+
+        # Normalize so whitespace variations of the same header don't count as a new token
+        auth_header = (await request.header_value('authorization') or '').strip()
+        if auth_header and TMA_AUTH.search(auth_header):
+            # Ensure we have the full token with 'tma ' prefix
+            new_token = auth_header if auth_header.startswith('tma ') else f'tma {auth_header}'
+
+            if new_token != self.auth_token:
+                self.auth_token = new_token
+                self._token_event.set()
+                logger.info("🔑 Captured fresh authorization token!")
+                logger.info(f"🔍 Token preview: {new_token[:50]}...")
+
+    async def _wait_for_portals(self, login_timeout: float) -> bool:
+        """Wait until the page navigates to Portals.
+        
+        Navigation events wake the wait immediately; the URL is also rechecked with
+        backoff (0.2s doubling up to 3s) in case an event is missed.
+        """
+        nav_event = asyncio.Event()
+
+        def on_navigated(frame):
+            if frame == self.page.main_frame and 'portals' in frame.url.lower():
+                nav_event.set()
+
+        self.page.on('framenavigated', on_navigated)
+        try:
+            deadline = time.monotonic() + login_timeout
+            delay = 0.2
+            while 'portals' not in self.page.url.lower():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(nav_event.wait(), timeout=min(delay, remaining))
+                    nav_event.clear()
+                except asyncio.TimeoutError:
+                    delay = min(delay * 2, 3.0)
+            return True
+        finally:
+            self.page.remove_listener('framenavigated', on_navigated)
+
+    async def _try_click(self, selector: str, element):
+        try:
+            await element.click()
+            logger.info(f"🖱️ Clicked element: {selector}")
+        except Exception:
+            pass
+
+    async def extract(self) -> Optional[str]:
+        """Extract fresh token by navigating to Portals channel"""
+        self.auth_token = None
+        self._token_event.clear()
+        try:
+            logger.info("🚀 Extracting fresh authorization token...")
+
+            if not await self.setup_browser():
+                return None
+
+            # A persistent context opens with a blank tab; use it rather than adding another
+            if self.page is None or self.page.is_closed():
+                pages = self.context.pages
+                self.page = pages[0] if pages else await self.context.new_page()
+            await self.page.set_viewport_size({"width": 1920, "height": 1080})
+            # Fail fast on missing elements and stalled navigations
+            self.page.set_default_timeout(CFG.BROWSER_ACTION_TIMEOUT)
+            self.page.set_default_navigation_timeout(CFG.BROWSER_NAV_TIMEOUT)
+
+            # Navigate to Portals channel on Telegram Web
+            portals_url = CFG.PORTALS_CHANNEL_URL
+            logger.info(f"🌐 Navigating to: {portals_url}")
+
+            try:
+                # Set referrer to match the expected flow
+                await self.page.set_extra_http_headers({
+                    'Referer': CFG.PORTALS_MARKET_ACTIVITY_URL
+                })
+
+                # A fresh profile loads Telegram Web from scratch, so allow the full timeout
+                goto_timeout = CFG.BROWSER_TIMEOUT if self._cold_start else CFG.BROWSER_NAV_TIMEOUT
+                await self.page.goto(portals_url, wait_until='domcontentloaded', timeout=goto_timeout)
+                # Telegram Web renders client-side; wait for its first buttons instead of network idle
+                try:
+                    await self.page.wait_for_selector('.btn-primary, button', timeout=5000)
+                except Exception:
+                    pass
+
+                # Check current URL to see if we need login
+                current_url = self.page.url
+                logger.info(f"📍 Current URL: {current_url}")
+
+                # If redirected to login, wait for user
+                if 'login' in current_url.lower() or 'auth' in current_url.lower():
+                    logger.info("🔐 Please complete login in the browser window...")
+                    logger.info("⏳ Waiting for login completion and navigation to Portals...")
+
+                    # Wait for redirect to Portals
+                    if not await self._wait_for_portals(login_timeout=180):  # 3 minutes
+                        logger.error("⏰ Login/navigation timeout")
+                        return None
+                    logger.info("✅ Successfully navigated to Portals channel")
+
+                # Look for the "VIEW IN TELEGRAM" button or similar elements
+                try:
+                    # Try to find and click the "VIEW IN TELEGRAM" button
+                    view_button_selectors = [
+                        'button:has-text("VIEW IN TELEGRAM")',
+                        'a:has-text("VIEW IN TELEGRAM")',
+                        '[class*="view"]:has-text("TELEGRAM")',
+                        'button[class*="btn"]',
+                        '.btn-primary'
+                    ]
+
+                    for selector in view_button_selectors:
+                        try:
+                            element = await self.page.wait_for_selector(selector, timeout=1500)
+                            if element:
+                                await element.click()
+                                logger.info(f"🖱️ Clicked: {selector}")
+                                await asyncio.sleep(3)
+                                break
+                        except:
+                            continue
+
+                    # Wait for potential redirect to portals-market.com
+                    try:
+                        await self.page.wait_for_url(PORTALS_MARKET_URL, timeout=5000)
+                    except Exception:
+                        pass
+                    current_url = self.page.url
+                    logger.info(f"📍 After click, URL: {current_url}")
+
+                    # If we're now on portals-market.com, great!
+                    if 'portals-market.com' in current_url:
+                        logger.info("✅ Successfully navigated to Portals Market!")
+                        await self.save_storage_state()
+
+                        # Try to navigate to market activity page
+                        try:
+                            await self.page.goto(CFG.PORTALS_MARKET_ACTIVITY_URL, wait_until='domcontentloaded')
+                            logger.info("📊 Navigated to market activity page")
+                        except:
+                            logger.info("📊 Staying on current portals-market.com page")
+
+                except Exception as e:
+                    logger.debug("Button interaction error: %s", e)
+
+                # Try to interact with the page to trigger API calls
+                try:
+                    # Try clicking various elements to trigger API requests
+                    selectors_to_try = [
+                        'button',
+                        '[role="button"]',
+                        '.btn',
+                        'div[onclick]',
+                        'a',
+                        '[class*="button"]',
+                        '[class*="btn"]',
+                        '[class*="market"]',
+                        '[class*="activity"]'
+                    ]
+
+                    candidates = []
+                    for selector in selectors_to_try:
+                        try:
+                            elements = await self.page.query_selector_all(selector)
+                            candidates.extend((selector, element) for element in elements[:5])  # First 5 of each
+                        except:
+                            continue
+
+                    # Any API call will do, so click the candidates concurrently and wait for the token
+                    await asyncio.gather(*(self._try_click(selector, element)
+                                           for selector, element in candidates[:20]))
+                    try:
+                        await asyncio.wait_for(self._token_event.wait(), timeout=10)
+                    except asyncio.TimeoutError:
+                        pass
+
+                    # Scroll to trigger lazy loading and more API calls
+                    await self.page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+                    await asyncio.sleep(3)
+                    await self.page.evaluate('window.scrollTo(0, 0)')
+                    await asyncio.sleep(2)
+
+                    # Try refreshing the page to trigger more requests
+                    if not self._token_event.is_set():
+                        logger.info("🔄 Refreshing page to trigger more API calls...")
+                        await self.page.reload(wait_until='domcontentloaded')
+
+                except Exception as e:
+                    logger.debug("Interaction error: %s", e)
+
+                # Wait for token to be captured, reloading the page every 20 seconds
+                max_wait = 120  # 2 minutes
+                for wait_time in range(20, max_wait + 1, 20):
+                    try:
+                        await asyncio.wait_for(self._token_event.wait(), timeout=20)
+                        break
+                    except asyncio.TimeoutError:
+                        logger.info("⏳ Still waiting for token... (%s/%ss)", wait_time, max_wait)
+                        # Try another interaction
+                        try:
+                            await self.page.evaluate('window.location.reload()')
+                        except:
+                            pass
+
+                if self._token_event.is_set():
+                    logger.info("🎉 Successfully extracted fresh token!")
+                    return self.auth_token
+                else:
+                    logger.warning("⚠️ Could not capture token automatically")
+                    logger.info("📝 Please interact with the Portals Market app manually to trigger API calls")
+                    logger.info("💡 Try clicking on different sections, scrolling, or refreshing the page")
+                    return None
+
+            except Exception as e:
+                logger.error(f"🚨 Navigation error: {e}")
+                return None
+
+        except Exception as e:
+            logger.error(f"💥 Token extraction failed: {e}")
+            return None
+
+    async def save_storage_state(self):
+        """Snapshot cookies and local storage as a second way back in if the profile is lost"""
+        try:
+            state = await self.context.storage_state()
+            # The snapshot is a full Telegram Web login, so keep it private like session.json
+            await asyncio.to_thread(_write_private_file, CFG.BROWSER_STORAGE_STATE, orjson.dumps(state))
+            logger.info("💾 Browser storage state saved")
+        except Exception as e:
+            logger.warning(f"Could not save browser storage state: {e}")
+
+    async def restore_storage_state(self):
+        """Copy the saved cookies and local storage into a freshly created persistent profile"""
+        try:
+            with open(CFG.BROWSER_STORAGE_STATE, 'rb') as f:
+                state = orjson.loads(f.read())
+            await self.context.add_cookies(state.get('cookies', []))
+            origins = {entry['origin']: {item['name']: item['value'] for item in entry.get('localStorage', [])}
+                       for entry in state.get('origins', [])}
+            await self.context.add_init_script(f"{RESTORE_LOCAL_STORAGE_JS}({orjson.dumps(origins).decode()})")
+        except Exception as e:
+            logger.warning(f"Could not restore browser storage state: {e}")
+
+    async def close(self):
+        """Close the browser context and Playwright (profile data stays on disk)"""
+        try:
+            if self.context:
+                await self.context.close()
+                self.context = self.page = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+        except Exception as e:
+            logger.debug(f"Browser close error: {e}")
+
+        # Persist the RAM profile once Chromium has let go of it
+        if self._ram_profile:
+            try:
+                user_data_dir = os.path.join(os.getcwd(), CFG.BROWSER_USER_DATA_DIR)
+                await asyncio.to_thread(_mirror_dir, self._ram_profile, user_data_dir)
+                logger.info("💾 Browser profile synced back to disk")
+            except Exception as e:
+                logger.warning(f"Could not sync browser profile to disk: {e}")
+            self._ram_profile = None
+
+async def main() -> int:
+    """Print a fresh token on stdout; exit status 1 if none was captured"""
+    extractor = PortalsTokenExtractor()
+    try:
+        token = await extractor.extract()
+        # Hand the token over before closing; with a RAM profile, close() also copies it to disk
+        if token:
+            print(token, flush=True)
+    finally:
+        await extractor.close()
+
+    return 0 if token else 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
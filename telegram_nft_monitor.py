@@ -6,18 +6,36 @@ Monitors Portals Market API with automatic token refresh, rate limiting, and dup
 
 import asyncio
 import aiohttp
-import json
+import atexit
+import base64
+import bisect
+import functools
+import hashlib
+import heapq
+import html
+import itertools
 import logging
+import logging.handlers
+import math
+import orjson
 import os
+import queue
+import random
+import struct
 import sys
 import time
-from datetime import datetime, timezone, timedelta
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
-from playwright.async_api import async_playwright, Page, Browser
+from aiolimiter import AsyncLimiter
 from aiogram import Bot
-from aiogram.exceptions import TelegramRetryAfter, TelegramAPIError
+from aiogram.exceptions import TelegramRetryAfter, TelegramAPIError, TelegramNetworkError
 from aiogram.enums import ParseMode
-import config
+from aiogram.types import Message
+from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError, RPCError
+from config import CFG
 
 # Fix Windows console encoding for emojis
 if sys.platform == "win32":
@@ -25,65 +43,364 @@ if sys.platform == "win32":
     sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
     sys.stderr = codecs.getwriter("utf-8")(sys.stderr.detach())
 
-# Configure logging with UTF-8 encoding
-class UTF8FileHandler(logging.FileHandler):
-    def __init__(self, filename, mode='a', encoding='utf-8', delay=False):
-        super().__init__(filename, mode, encoding, delay)
+# Configure logging with UTF-8 encoding. Records are queued and written by a
+# listener thread so file/console writes never block the event loop.
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_log_file_handler = logging.handlers.RotatingFileHandler(
+    CFG.LOG_FILE,
+    maxBytes=CFG.LOG_MAX_SIZE_MB * 1024 * 1024,
+    backupCount=CFG.LOG_BACKUP_COUNT,
+    encoding='utf-8'
+)
+_log_console_handler = logging.StreamHandler(sys.stdout)
+for _handler in (_log_file_handler, _log_console_handler):
+    _handler.setFormatter(_log_formatter)
+
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_file_handler, _log_console_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
+# The queue side only merges args into the message; _log_formatter adds the prefix once
 logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        UTF8FileHandler(config.LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
+    level=getattr(logging, CFG.LOG_LEVEL),
+    format='%(message)s',
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+# Price tiers; a sale's tier is the number of TIER_BOUNDS it reaches
+TIER_NORMAL, TIER_HIGH, TIER_PIN, TIER_ULTRA = range(4)
+TIER_BOUNDS = (CFG.HIGH_VALUE_THRESHOLD, CFG.PIN_MESSAGE_THRESHOLD, CFG.ULTRA_VALUE_THRESHOLD)
+
+def price_tier(amount: float) -> int:
+    """Classify a sale price with one binary search over the tier thresholds"""
+    return bisect.bisect_right(TIER_BOUNDS, amount)
+
+@functools.lru_cache(maxsize=1024)
+def format_timestamp(created_at: str) -> str:
+    """Format an API timestamp for display, falling back to the raw value"""
+    try:
+        iso = created_at[:-1] + '+00:00' if created_at.endswith('Z') else created_at
+        return datetime.fromisoformat(iso).strftime('%Y-%m-%d %H:%M UTC')
+    except:
+        return created_at
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(timestamp: str) -> float:
+    """Parse an API ISO timestamp to epoch seconds (naive values are taken as UTC, unparsable as 0)"""
+    try:
+        if timestamp.endswith('Z'):
+            timestamp = timestamp[:-1] + '+00:00'
+        dt = datetime.fromisoformat(timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def action_key(nft_id: str, created_at: str, amount) -> int:
+    """Compact 64-bit id for an API action (NFT, time and price)"""
+    digest = hashlib.blake2b(f"{nft_id}|{created_at}|{amount}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def backoff_delay(attempt: int, initial: float = 1.0, maximum: float = 10.0) -> float:
+    """Exponential backoff with jitter for a 0-based retry attempt"""
+    return min(maximum, initial * 2 ** attempt) + random.uniform(0, 1)
+
+class SlidingBloomFilter:
+    """Bloom filter over a sliding time window, built from a ring of sub-filters.
+    
+    New items go into the newest sub-filter and the oldest one is cleared every
+    window / slices seconds, so memory stays fixed no matter how many items are added.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float, window_seconds: float, slices: int = 4):
+        self.slices = slices
+        self.rotate_every = window_seconds / slices
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.filters = [bytearray((self.num_bits + 7) // 8) for _ in range(slices)]
+        self.current = 0
+        self.last_rotation = time.time()
+    
+    def _positions(self, item: str | int) -> List[int]:
+        """Bit positions for an item using double hashing over one blake2b digest"""
+        data = item.to_bytes(8, 'little') if isinstance(item, int) else item.encode()
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def _rotate(self):
+        """Clear expired sub-filters"""
+        elapsed = int((time.time() - self.last_rotation) // self.rotate_every)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, self.slices)):
+            self.current = (self.current + 1) % self.slices
+            self.filters[self.current] = bytearray(len(self.filters[self.current]))
+        self.last_rotation += elapsed * self.rotate_every
+    
+    def add(self, item: str | int):
+        self._rotate()
+        bits = self.filters[self.current]
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, item: str | int) -> bool:
+        self._rotate()
+        positions = self._positions(item)
+        return any(
+            all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+            for bits in self.filters
+        )
+    
+    # num_bits, num_hashes, slices, current, last_rotation; the sub-filters follow as raw bytes
+    _HEADER = struct.Struct('<QIIId')
+    
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(self.num_bits, self.num_hashes, self.slices, self.current, self.last_rotation)
+        return header + b''.join(self.filters)
+    
+    def load_bytes(self, data: bytes) -> bool:
+        """Restore a filter saved by to_bytes; ignored if it was built with different settings"""
+        size = self._HEADER.size
+        if len(data) < size:
+            return False
+        num_bits, num_hashes, slices, current, last_rotation = self._HEADER.unpack_from(data)
+        filter_len = (self.num_bits + 7) // 8
+        if ((num_bits, num_hashes, slices) != (self.num_bits, self.num_hashes, self.slices)
+                or len(data) != size + slices * filter_len):
+            return False
+        self.filters = [bytearray(data[size + i * filter_len:size + (i + 1) * filter_len])
+                        for i in range(slices)]
+        self.current = current
+        self.last_rotation = last_rotation
+        return True
+    
+    def load_dict(self, data: Dict) -> bool:
+        """Restore a filter from an older JSON state file (base64 sub-filters)"""
+        if (data.get('num_bits') != self.num_bits or data.get('num_hashes') != self.num_hashes
+                or len(data.get('filters', [])) != self.slices):
+            return False
+        self.filters = [bytearray(base64.b64decode(bits)) for bits in data['filters']]
+        self.current = data['current']
+        self.last_rotation = data['last_rotation']
+        return True
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used key.
+    
+    Backed by OrderedDict (a doubly linked list in C), so get, put and eviction are O(1).
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+    
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+    
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+    
+    def __contains__(self, key) -> bool:
+        return key in self._data
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+STATE_FILE = 'monitor_state.json'
+STATE_JOURNAL_FILE = 'monitor_state.log'
+SEEN_FILTER_FILE = 'monitor_state.seen.bloom'
+SALE_FILTER_FILE = 'monitor_state.sales.bloom'
+STATE_JOURNAL_OLD_FILE = 'monitor_state.log.old'  # journal being folded into a snapshot
+TOKEN_FILE = 'auth_token.txt'
+TOKEN_STAT_TTL = 5.0  # seconds a stat of TOKEN_FILE is trusted before checking again
+EXTRACTOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extract_token.py')
+
+@dataclass(slots=True)
+class PriceRecord:
+    """Last sent sale of one NFT, slotted so entries carry no per-instance dict"""
+    price: float
+    timestamp: str      # created_at as returned by the API, kept for display
+    ts_epoch: float
+    action_id: int
+    name: str
+    external_number: str
+    expires_at: float
+    
+    @classmethod
+    def from_dict(cls, data: Dict, default_expiry: float) -> 'PriceRecord':
+        """Build from a saved entry, filling fields missing from older state files"""
+        return cls(
+            price=float(data['price']),
+            timestamp=data['timestamp'],
+            ts_epoch=data.get('ts_epoch') or parse_timestamp(data['timestamp']),
+            action_id=data.get('action_id', 0),
+            name=data.get('name', ''),
+            external_number=data.get('external_number', ''),
+            expires_at=data.get('expires_at', default_expiry)
+        )
+
+@dataclass(slots=True)
+class ParsedAction:
+    """Fields of one API purchase action, unpacked once when it first arrives"""
+    id: str
+    name: str
+    ext: str            # external collection number
+    price: float
+    ts: str             # created_at as returned by the API
+    ts_epoch: float
+    action_id: int
+    attrs: Dict[str, Dict]  # attributes keyed by type
+    url: str            # escaped t.me link
+    raw: Dict
+    
+    @classmethod
+    def parse(cls, action: Dict) -> 'ParsedAction':
+        nft = action['nft']
+        created_at = action['created_at']
+        formatted_name = nft['name'].replace(' ', '')
+        return cls(
+            id=nft['id'],
+            name=nft['name'],
+            ext=nft['external_collection_number'],
+            price=float(action['amount']),
+            ts=created_at,
+            ts_epoch=parse_timestamp(created_at),
+            action_id=action_key(nft['id'], created_at, action['amount']),
+            attrs={attr['type']: attr for attr in nft.get('attributes', [])},
+            url=html.escape(f"https://t.me/nft/{formatted_name}-{nft['external_collection_number']}", quote=True),
+            raw=action
+        )
+
 class TelegramNFTMonitor:
     def __init__(self):
         # Telegram Bot Client
-        self.bot = Bot(token=config.BOT_TOKEN)
+        self.bot = Bot(token=CFG.BOT_TOKEN)
+        
+        # Telegram user client (MTProto) for event-driven monitoring
+        self.user_client: Optional[TelegramClient] = None
+        self.market_event = asyncio.Event()
         
         # Configuration from centralized config
-        self.channel_username = config.CHANNEL_USERNAME
-        self.api_url = config.PORTALS_API_URL
+        self.channel_username = CFG.CHANNEL_USERNAME
+        self._chat_id = self.channel_username         # numeric id once resolved at startup
+        self._channel_entity = self.channel_username  # user-client input entity once resolved
+        self.api_url = CFG.PORTALS_API_URL
+        
+        # Shared HTTP session (keep-alive connections reused across API calls)
+        self.http: Optional[aiohttp.ClientSession] = None
+        
+        # API request headers and params, built once and reused by every poll
+        self._api_headers = {
+            'authorization': '',
+            'accept': 'application/json, text/plain, */*',
+            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        self._api_params = {
+            'offset': 0,
+            'limit': 20,
+            'action_types': 'buy'
+        }
+        
+        # Conditional-request validators from the last full API response
+        self._last_etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._last_body_digest: Optional[bytes] = None
         
         # Token management
         self.auth_token: Optional[str] = None
         self.token_last_updated: Optional[datetime] = None
-        self.token_refresh_interval = config.TOKEN_REFRESH_INTERVAL
+        self.token_refresh_interval = CFG.TOKEN_REFRESH_INTERVAL
         self.token_extraction_in_progress = False
-        
-        # Browser automation
-        self.playwright = None
-        self.browser: Optional[Browser] = None
-        self.context: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        self.token_refresh_failures = 0  # failed extractions in a row while no token was usable
+        self.token_rotations = 0  # distinct tokens saved during this run
+        self._extractor_proc: Optional[asyncio.subprocess.Process] = None  # extractor still closing down
+        self._extractor_relay: Optional[asyncio.Task] = None  # copies its stderr into our log
+        # Last known contents and mtime of TOKEN_FILE, so checks don't hit the disk every time
+        self._token_file_token: Optional[str] = None
+        self._token_file_mtime = 0.0
+        self._token_checked_at = float('-inf')
+        self._token_ready = asyncio.Event()         # set while self.auth_token is usable
+        self._refresh_requested = asyncio.Event()   # wakes the background refresher early
+        self._refresh_task: Optional[asyncio.Task] = None
         
         # State management with price tracking
-        self.seen_actions: set[str] = set()
-        self.price_history: Dict[str, Dict] = {}  # NFT ID -> {price, timestamp, action_id}
+        self.seen_actions = SlidingBloomFilter(
+            capacity=CFG.SEEN_FILTER_CAPACITY,
+            error_rate=CFG.SEEN_FILTER_ERROR_RATE,
+            window_seconds=CFG.DUPLICATE_MEMORY_HOURS * 3600,
+            slices=CFG.DUPLICATE_FILTER_K
+        )
+        self.recent_actions = LRUCache(CFG.SEEN_LRU_SIZE)  # exact action ids, checked before the filter
+        self.price_history: Dict[str, PriceRecord] = {}  # NFT ID -> last sent sale
+        self.sale_filter = SlidingBloomFilter(
+            capacity=CFG.DUPLICATE_FILTER_CAPACITY,
+            error_rate=CFG.DUPLICATE_FILTER_ERROR_RATE,
+            window_seconds=CFG.DUPLICATE_MEMORY_HOURS * 3600,
+            slices=CFG.DUPLICATE_FILTER_K
+        )
+        self.recent_sales = LRUCache(CFG.DUPLICATE_LRU_SIZE)  # NFT ID -> price bucket of last sent sale
+        self._expiry_heap: list[tuple[float, str]] = []  # (expires_at, NFT ID), smallest first
+        self._by_name_ext: Dict[Tuple[str, str], str] = {}  # (name, external number) -> NFT ID
         self.last_check_time = None
+        self._tick_now = time.time()  # wall clock captured once per monitoring tick
         
         # Batch processing state
         self.initial_batch_sent = False
         self.last_processed_timestamp = None
         self.waiting_for_new_sales = False
         
-        # Rate limiting
-        self.message_timestamps = []
+        # Rate limiting (token buckets: bursts go out immediately up to the cap)
+        self.minute_limiter = AsyncLimiter(CFG.MAX_MESSAGES_PER_MINUTE, 60)
+        self.mtproto_minute_limiter = AsyncLimiter(CFG.MAX_MTPROTO_MESSAGES_PER_MINUTE, 60)
+        self.global_limiter = AsyncLimiter(30, 1)  # Bot API limit across all chats
+        
+        # Outgoing notifications, drained in order by a single sender task
+        self._send_q: asyncio.Queue = asyncio.Queue(maxsize=CFG.SEND_QUEUE_SIZE)
+        self._sender_task: Optional[asyncio.Task] = None
+        self._pause_until = 0.0  # loop time before which nothing is sent (flood control)
+        self.hour_limiter = AsyncLimiter(CFG.MAX_MESSAGES_PER_HOUR, 3600)
         self.daily_message_count = 0
         self.last_daily_reset = datetime.now().date()
         
+        # Message templates indexed by price tier (static parts escaped once)
+        tpl_high = self._build_message_templates(CFG.HIGH_VALUE_SALE_HEADER)
+        self._templates = (self._build_message_templates(CFG.SALE_HEADER), tpl_high, tpl_high,
+                           self._build_message_templates(CFG.ULTRA_VALUE_SALE_HEADER))
+        # Emoji indexed by price tier; switched to premium emojis once the user client is up
+        self._tier_emojis = CFG.STD_EMOJI_BY_TIER
+        
         # Request settings
-        self.request_timeout = config.REQUEST_TIMEOUT
-        self.retry_attempts = config.RETRY_ATTEMPTS
-        self.sleep_interval = config.CHECK_INTERVAL
+        self.request_timeout = CFG.REQUEST_TIMEOUT
+        self._request_timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        self.retry_attempts = CFG.RETRY_ATTEMPTS
+        self.sleep_interval = CFG.CHECK_INTERVAL
+        # Adaptive poll interval: halves when new sales arrive, grows 1.3x on empty checks
+        self._poll = min(max(float(CFG.CHECK_INTERVAL), CFG.POLL_MIN_INTERVAL), CFG.POLL_MAX_INTERVAL)
         self.running = False
         
-        # Load previous state
+        # Load previous state, then append further changes to the journal
+        self._journal_entries = 0
+        self._save_lock = asyncio.Lock()
         self.load_state()
+        self._journal = open(STATE_JOURNAL_FILE, 'ab')
+        
+        # Reuse a recent token written by authenticate_telegram.py or a previous run
+        self.load_session_cache()
         
         # Setup signal handlers for graceful shutdown
         import signal
@@ -94,181 +411,307 @@ class TelegramNFTMonitor:
         """Handle shutdown signals gracefully"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        # Wake the monitoring loop and token refresher if they are waiting
+        self.market_event.set()
+        self._refresh_requested.set()
     
     def load_state(self):
-        """Load previously seen actions and price history from file"""
+        """Load the state snapshot, then replay changes journaled since it was written"""
         try:
-            if os.path.exists('monitor_state.json'):
-                with open('monitor_state.json', 'r') as f:
-                    data = json.load(f)
-                    self.seen_actions = set(data.get('seen_actions', []))
-                    self.price_history = data.get('price_history', {})
-                    self.last_check_time = data.get('last_check_time')
-                    self.daily_message_count = data.get('daily_message_count', 0)
-                    
-                    # Check if we need to reset daily counter
-                    last_reset = data.get('last_daily_reset')
-                    if last_reset:
-                        try:
-                            last_reset_date = datetime.fromisoformat(last_reset).date()
-                            if last_reset_date != datetime.now().date():
-                                self.daily_message_count = 0
-                                self.last_daily_reset = datetime.now().date()
-                        except Exception as e:
-                            logger.warning(f"⚠️ Error parsing last_daily_reset: {e}")
-                            self.daily_message_count = 0
-                            self.last_daily_reset = datetime.now().date()
-                    
-                logger.info(f"Loaded {len(self.seen_actions)} previously seen actions")
-                logger.info(f"Loaded {len(self.price_history)} price history entries")
+            data = {}
+            if os.path.exists(STATE_FILE):
+                with open(STATE_FILE, 'rb') as f:
+                    data = orjson.loads(f.read())
+            
+            # Older state files kept the filters inside the JSON; plain id lists predate
+            # the 64-bit action keys and could never match, so they are ignored
+            seen = data.get('seen_actions')
+            if isinstance(seen, dict):
+                self.seen_actions.load_dict(seen)
+            if 'sale_filter' in data:
+                self.sale_filter.load_dict(data['sale_filter'])
+            for path, bloom, label in ((SEEN_FILTER_FILE, self.seen_actions, "Seen-action"),
+                                       (SALE_FILTER_FILE, self.sale_filter, "Duplicate")):
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        if not bloom.load_bytes(f.read()):
+                            logger.info(f"{label} filter settings changed, starting with an empty filter")
+            
+            default_expiry = time.time() + CFG.DUPLICATE_MEMORY_HOURS * 3600
+            self.price_history = {nft_id: PriceRecord.from_dict(entry, default_expiry)
+                                  for nft_id, entry in data.get('price_history', {}).items()}
+            
+            self.replay_journal(data, default_expiry)
+            self.last_check_time = data.get('last_check_time')
+            self.daily_message_count = data.get('daily_message_count', 0)
+            
+            # Check if we need to reset daily counter
+            last_reset = data.get('last_daily_reset')
+            if last_reset:
+                try:
+                    last_reset_date = datetime.fromisoformat(last_reset).date()
+                    if last_reset_date != datetime.now().date():
+                        self.daily_message_count = 0
+                        self.last_daily_reset = datetime.now().date()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error parsing last_daily_reset: {e}")
+                    self.daily_message_count = 0
+                    self.last_daily_reset = datetime.now().date()
+            
+            for nft_id, entry in self.price_history.items():
+                self.recent_sales.put(nft_id, self.price_bucket(entry.price))
+                self._expiry_heap.append((entry.expires_at, nft_id))
+                self._by_name_ext[(entry.name, entry.external_number)] = nft_id
+            heapq.heapify(self._expiry_heap)
+            
+            if data or self._journal_entries:
+                logger.info(f"Loaded {len(self.price_history)} price history entries "
+                            f"({self._journal_entries} journaled changes)")
         except Exception as e:
             logger.warning(f"Could not load previous state: {e}")
     
-    def save_state(self):
-        """Save current state to file"""
+    def replay_journal(self, meta: dict, default_expiry: float):
+        """Apply journal records written after the snapshot; the latest counters go into meta"""
+        for path in (STATE_JOURNAL_OLD_FILE, STATE_JOURNAL_FILE):
+            if os.path.exists(path):
+                self._replay_journal_file(path, meta, default_expiry)
+    
+    def _replay_journal_file(self, path: str, meta: dict, default_expiry: float):
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A partial last line from a crash mid-write
+                    logger.warning("⚠️ Skipping corrupt state journal record")
+                    continue
+                op = record.get('op')
+                if op == 'seen':
+                    self.seen_actions.add(record['id'])
+                elif op == 'add':
+                    entry = PriceRecord.from_dict(record['entry'], default_expiry)
+                    self.price_history[record['id']] = entry
+                    self.sale_filter.add(self.sale_key(record['id'], entry.price))
+                elif op == 'del':
+                    self.price_history.pop(record['id'], None)
+                elif op == 'meta':
+                    meta.update(record)
+                self._journal_entries += 1
+    
+    def _journal_write(self, record: dict):
+        """Append one state change to the journal (flushed by save_state)"""
+        self._journal.write(orjson.dumps(record) + b'\n')
+        self._journal_entries += 1
+    
+    async def save_state(self, compact: bool = False):
+        """Flush journaled changes, rewriting the snapshot once the journal grows large"""
         try:
-            with open('monitor_state.json', 'w') as f:
-                json.dump({
-                    'seen_actions': list(self.seen_actions),
-                    'price_history': self.price_history,
-                    'last_check_time': self.last_check_time,
-                    'daily_message_count': self.daily_message_count,
-                    'last_daily_reset': self.last_daily_reset.isoformat()
-                }, f)
+            self._journal_write({
+                'op': 'meta',
+                'last_check_time': self.last_check_time,
+                'daily_message_count': self.daily_message_count,
+                'last_daily_reset': self.last_daily_reset.isoformat()
+            })
+            self._journal.flush()
+            
+            due = (compact or self._journal_entries >= CFG.STATE_COMPACT_EVERY
+                   or self._journal.tell() >= CFG.STATE_JOURNAL_MAX_BYTES)
+            # A compaction already in flight covers this one
+            if due and not self._save_lock.locked():
+                async with self._save_lock:
+                    await self.compact_state()
         except Exception as e:
             logger.error(f"Could not save state: {e}")
     
+    async def compact_state(self):
+        """Write a full snapshot off the event loop and start a fresh journal"""
+        files = (
+            (SEEN_FILTER_FILE, self.seen_actions.to_bytes()),
+            (SALE_FILTER_FILE, self.sale_filter.to_bytes()),
+            # JSON goes last: once it is replaced the old journal is no longer needed
+            (STATE_FILE, orjson.dumps({
+                'price_history': self.price_history,
+                'last_check_time': self.last_check_time,
+                'daily_message_count': self.daily_message_count,
+                'last_daily_reset': self.last_daily_reset.isoformat()
+            }, option=orjson.OPT_NON_STR_KEYS))
+        )
+        
+        # Changes made while the snapshot is written go to the new journal;
+        # the old one is only removed once the snapshot is in place
+        self._journal.close()
+        self._rotate_journal()
+        self._journal = open(STATE_JOURNAL_FILE, 'ab')
+        self._journal_entries = 0
+        await asyncio.to_thread(self._write_snapshot, files)
+    
+    @staticmethod
+    def _rotate_journal():
+        """Move the journal aside for compaction.
+        
+        A .old journal left by a compaction that failed is still the only record of its changes,
+        so the current journal is appended to it rather than replacing it.
+        """
+        if not os.path.exists(STATE_JOURNAL_OLD_FILE):
+            os.replace(STATE_JOURNAL_FILE, STATE_JOURNAL_OLD_FILE)
+            return
+        logger.warning("⚠️ Previous state compaction did not finish, merging its journal")
+        with open(STATE_JOURNAL_FILE, 'rb') as src, open(STATE_JOURNAL_OLD_FILE, 'ab') as dest:
+            dest.write(src.read())
+            dest.flush()
+            os.fsync(dest.fileno())
+        os.remove(STATE_JOURNAL_FILE)
+    
+    @staticmethod
+    def _write_snapshot(files: Tuple[Tuple[str, bytes], ...]):
+        """Atomically replace each snapshot file in order, then drop the journal they cover"""
+        for path, data in files:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        os.remove(STATE_JOURNAL_OLD_FILE)
+    
     def cleanup_old_price_history(self):
         """Remove old price history entries"""
-        cutoff_time = datetime.now().replace(tzinfo=None) - timedelta(hours=config.DUPLICATE_MEMORY_HOURS)
+        cutoff = time.time() - CFG.DUPLICATE_MEMORY_HOURS * 3600
         
-        to_remove = []
-        for nft_id, data in self.price_history.items():
-            try:
-                # Parse timestamp and make it timezone-naive for comparison
-                timestamp_str = data['timestamp']
-                if 'Z' in timestamp_str or '+' in timestamp_str:
-                    # Parse ISO format with timezone
-                    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    # Convert to naive datetime for comparison
-                    timestamp = timestamp.replace(tzinfo=None)
-                else:
-                    # Already naive
-                    timestamp = datetime.fromisoformat(timestamp_str)
-                
-                if timestamp < cutoff_time:
-                    to_remove.append(nft_id)
-            except Exception as e:
-                logger.warning(f"⚠️ Error parsing timestamp for {nft_id}: {e}")
-                to_remove.append(nft_id)  # Remove problematic entries
+        kept = {k: v for k, v in self.price_history.items() if v.ts_epoch >= cutoff}
+        removed = [(k, v) for k, v in self.price_history.items() if k not in kept]
+        self.price_history = kept
         
-        for nft_id in to_remove:
-            del self.price_history[nft_id]
+        for nft_id, entry in removed:
+            self._forget_sale(nft_id, entry)
         
-        if to_remove:
-            logger.info(f"Cleaned up {len(to_remove)} old price history entries")
+        if removed:
+            logger.info(f"Cleaned up {len(removed)} old price history entries")
     
-    async def check_rate_limits(self) -> bool:
-        """Check if we can send a message without hitting rate limits"""
-        now = datetime.now()
+    def _forget_sale(self, nft_id: str, entry: PriceRecord):
+        """Drop the lookups for a price history entry that was just removed"""
+        self.recent_sales.pop(nft_id)
+        key = (entry.name, entry.external_number)
+        if self._by_name_ext.get(key) == nft_id:
+            del self._by_name_ext[key]
+        self._journal_write({'op': 'del', 'id': nft_id})
+    
+    def expire_price_history(self, now: Optional[float] = None):
+        """Drop price history entries past DUPLICATE_MEMORY_HOURS, popping only expired heap items"""
+        if now is None:
+            now = self._tick_now
+        heap = self._expiry_heap
+        expired = 0
+        while heap and heap[0][0] <= now:
+            expires_at, nft_id = heapq.heappop(heap)
+            entry = self.price_history.get(nft_id)
+            # Skip stale heap items for NFTs that were updated again later
+            if entry and entry.expires_at <= expires_at:
+                del self.price_history[nft_id]
+                self._forget_sale(nft_id, entry)
+                expired += 1
         
-        # Reset daily counter if needed
-        if now.date() != self.last_daily_reset:
+        if expired:
+            logger.info("Expired %s price history entries", expired)
+    
+    def record_message_sent(self):
+        """Count a delivered message, starting a new daily count after midnight"""
+        today = datetime.now().date()
+        if today != self.last_daily_reset:
             self.daily_message_count = 0
-            self.last_daily_reset = now.date()
+            self.last_daily_reset = today
             logger.info("Daily message counter reset")
-        
-        # Clean old timestamps (older than 1 hour)
-        hour_ago = now - timedelta(hours=1)
-        self.message_timestamps = [ts for ts in self.message_timestamps if ts > hour_ago]
-        
-        # Check hourly limit
-        if len(self.message_timestamps) >= config.MAX_MESSAGES_PER_HOUR:
-            logger.warning(f"Hourly message limit reached ({config.MAX_MESSAGES_PER_HOUR})")
-            return False
-        
-        # Check per-minute limit
-        minute_ago = now - timedelta(minutes=1)
-        recent_messages = [ts for ts in self.message_timestamps if ts > minute_ago]
-        if len(recent_messages) >= config.MAX_MESSAGES_PER_MINUTE:
-            logger.warning(f"Per-minute message limit reached ({config.MAX_MESSAGES_PER_MINUTE})")
-            return False
-        
-        return True
+        self.daily_message_count += 1
+    
+    @staticmethod
+    def price_bucket(price: float) -> int:
+        """Price rounded to PRICE_CHANGE_THRESHOLD steps"""
+        return round(price / CFG.PRICE_CHANGE_THRESHOLD)
+    
+    @classmethod
+    def sale_key(cls, nft_id: str, price: float) -> str:
+        """Duplicate-filter key: NFT ID plus price bucket"""
+        return f"{nft_id}:{cls.price_bucket(price)}"
     
-    def is_duplicate_or_price_change(self, action: Dict) -> Tuple[bool, bool]:
+    def is_duplicate_or_price_change(self, action: ParsedAction) -> Tuple[bool, bool]:
         """Enhanced duplicate detection for gifts with same name but different price/number"""
-        nft = action['nft']
-        nft_id = nft['id']
-        nft_name = nft['name']
-        external_number = nft['external_collection_number']
-        current_price = float(action['amount'])
-        current_timestamp = action['created_at']
+        nft_id = action.id
+        current_price = action.price
+        
+        # Recently sent NFTs: exact answer, return on first hit
+        recent_bucket = self.recent_sales.get(nft_id)
+        if recent_bucket is not None:
+            if recent_bucket == self.price_bucket(current_price):
+                return True, False
+            return False, True
+        
+        # Same NFT at the same price already sent within DUPLICATE_MEMORY_HOURS
+        if self.sale_key(nft_id, current_price) in self.sale_filter:
+            return True, False
         
         # Check exact NFT ID first (same exact NFT)
         if nft_id in self.price_history:
             previous_data = self.price_history[nft_id]
-            previous_price = previous_data['price']
+            previous_price = previous_data.price
             price_diff = abs(current_price - previous_price)
             
-            if price_diff < config.PRICE_CHANGE_THRESHOLD:
+            if price_diff < CFG.PRICE_CHANGE_THRESHOLD:
                 # Same NFT, same price - this is a duplicate
                 return True, False
             else:
                 # Same NFT, different price - this is a price change (allow)
                 return False, True
         
-        # Check for similar gifts (same name but different external number)
-        similar_gifts = []
-        for stored_nft_id, data in self.price_history.items():
-            if stored_nft_id.startswith(f"{nft_name}_"):
-                similar_gifts.append((stored_nft_id, data))
-        
-        if similar_gifts:
-            # Check if this exact combination (name + external_number + price) was already sent
-            for stored_id, data in similar_gifts:
-                stored_price = data['price']
-                stored_timestamp = data['timestamp']
-                
-                # If same name, same external number, and similar price - likely duplicate
-                if (external_number in stored_id and 
-                    abs(current_price - stored_price) < config.PRICE_CHANGE_THRESHOLD):
-                    
-                    # Check timestamp to avoid sending very recent duplicates (within 5 minutes)
-                    try:
-                        from datetime import datetime
-                        current_dt = datetime.fromisoformat(current_timestamp.replace('Z', '+00:00'))
-                        stored_dt = datetime.fromisoformat(stored_timestamp.replace('Z', '+00:00'))
-                        time_diff = abs((current_dt - stored_dt).total_seconds())
-                        
-                        if time_diff < 300:  # 5 minutes
-                            logger.info(f"🔄 Similar gift detected within 5 minutes: {nft_name} #{external_number}")
-                            return True, False  # Treat as duplicate
-                    except:
-                        pass
+        # Same gift (name + external number) recorded under another NFT id
+        previous_id = self._by_name_ext.get((action.name, action.ext))
+        previous_data = self.price_history.get(previous_id) if previous_id else None
+        if (previous_data
+                and abs(current_price - previous_data.price) < CFG.PRICE_CHANGE_THRESHOLD
+                # Avoid sending very recent duplicates (within 5 minutes)
+                and abs(action.ts_epoch - previous_data.ts_epoch) < 300):
+            logger.info("🔄 Similar gift detected within 5 minutes: %s #%s", action.name, action.ext)
+            return True, False  # Treat as duplicate
         
         # Not a duplicate - new gift or significantly different
         return False, False
 
-    def update_price_history(self, action: Dict, action_id: str):
+    def update_price_history(self, action: ParsedAction, now: Optional[float] = None):
         """Enhanced price history tracking with gift name and external number"""
-        nft = action['nft']
-        nft_id = nft['id']
-        nft_name = nft['name']
-        external_number = nft['external_collection_number']
-        price = float(action['amount'])
-        
-        # Store with enhanced key for better tracking
-        enhanced_key = f"{nft_name}_{external_number}_{nft_id}"
-        
-        self.price_history[nft_id] = {
-            'price': price,
-            'timestamp': action['created_at'],
-            'action_id': action_id,
-            'name': nft_name,
-            'external_number': external_number,
-            'enhanced_key': enhanced_key
-        }
+        nft_id = action.id
+        price = action.price
+        
+        self.sale_filter.add(self.sale_key(nft_id, price))
+        self.recent_sales.put(nft_id, self.price_bucket(price))
+        
+        expires_at = (self._tick_now if now is None else now) + CFG.DUPLICATE_MEMORY_HOURS * 3600
+        entry = PriceRecord(
+            price=price,
+            timestamp=action.ts,
+            ts_epoch=action.ts_epoch,
+            action_id=action.action_id,
+            name=action.name,
+            external_number=action.ext,
+            expires_at=expires_at
+        )
+        self.price_history[nft_id] = entry
+        self._by_name_ext[(action.name, action.ext)] = nft_id
+        heapq.heappush(self._expiry_heap, (expires_at, nft_id))
+        self._journal_write({'op': 'add', 'id': nft_id, 'entry': entry})
+    
+    def get_http_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self.http is None or self.http.closed:
+            connector = aiohttp.TCPConnector(
+                limit=64,
+                limit_per_host=16,
+                keepalive_timeout=75,  # keep the API connection warm between polls
+                ttl_dns_cache=300
+            )
+            self.http = aiohttp.ClientSession(connector=connector, headers={
+                'Connection': 'keep-alive',
+                'Accept-Encoding': 'gzip'
+            })
+        return self.http
     
     async def validate_token(self, token: str) -> bool:
         """Validate token by making a test API request"""
@@ -282,19 +725,18 @@ class TelegramNFTMonitor:
         params = {'offset': 0, 'limit': 1, 'action_types': 'buy'}
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    self.api_url,
-                    params=params,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    is_valid = response.status == 200
-                    if is_valid:
-                        logger.info("✅ Token validation successful")
-                    else:
-                        logger.warning(f"❌ Token validation failed: {response.status}")
-                    return is_valid
+            async with self.get_http_session().get(
+                self.api_url,
+                params=params,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                is_valid = response.status == 200
+                if is_valid:
+                    logger.info("✅ Token validation successful")
+                else:
+                    logger.warning(f"❌ Token validation failed: {response.status}")
+                return is_valid
         except Exception as e:
             logger.error(f"❌ Token validation error: {e}")
             return False
@@ -302,21 +744,17 @@ class TelegramNFTMonitor:
     async def ensure_valid_token(self) -> bool:
         """Ensure we have a valid token, refresh if needed"""
         # Load existing token if available
-        if self.load_auth_token():
+        if await self.load_auth_token():
             # Check if existing token is valid
             if await self.validate_token(self.auth_token):
                 logger.info("✅ Existing token is valid")
                 return True
         
         # Check if existing token is recent enough to skip browser extraction
-        if self.is_token_valid():
-            try:
-                with open('auth_token.txt', 'r') as f:
-                    self.auth_token = f.read().strip()
-                logger.info("🔑 Using recent token file, skipping validation")
-                return True
-            except Exception as e:
-                logger.error(f"💥 Error loading recent token: {e}")
+        if await self.is_token_valid() and self._token_file_token:
+            self.auth_token = self._token_file_token
+            logger.info("🔑 Using recent token file, skipping validation")
+            return True
         
         # Extract fresh token
         logger.info("🔄 Token refresh needed, extracting fresh token...")
@@ -332,105 +770,234 @@ class TelegramNFTMonitor:
             logger.error("❌ No auth token available")
             return None
             
-        headers = {
-            'authorization': self.auth_token,
-            'accept': 'application/json, text/plain, */*',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        params = {
-            'offset': 0,
-            'limit': 20,
-            'action_types': 'buy'
-        }
+        headers = self._api_headers
+        headers['authorization'] = self.auth_token
+        if self._last_etag:
+            headers['if-none-match'] = self._last_etag
+        else:
+            headers.pop('if-none-match', None)
+        if self._last_modified:
+            headers['if-modified-since'] = self._last_modified
+        else:
+            headers.pop('if-modified-since', None)
         
         for attempt in range(self.retry_attempts):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        self.api_url,
-                        params=params,
-                        headers=headers,
-                        timeout=aiohttp.ClientTimeout(total=self.request_timeout)
-                    ) as response:
+                async with self.get_http_session().get(
+                    self.api_url,
+                    params=self._api_params,
+                    headers=headers,
+                    timeout=self._request_timeout
+                ) as response:
+                    
+                    if response.status == 304:
+                        # Nothing changed since the last response
+                        return []
+                    elif response.status == 200:
+                        self._last_etag = response.headers.get('ETag')
+                        self._last_modified = response.headers.get('Last-Modified')
+                        body = await response.read()
+                        
+                        # Without validators, skip parsing a body identical to the last one
+                        digest = hashlib.blake2b(body, digest_size=16).digest()
+                        if digest == self._last_body_digest:
+                            return []
                         
-                        if response.status == 200:
-                            data = await response.json()
-                            actions = data.get('actions', [])
-                            logger.info(f"📊 Fetched {len(actions)} actions from API")
-                            return actions
-                        elif response.status == 401:
-                            logger.warning("🔐 Authorization failed - token expired")
-                            return None
-                        else:
-                            logger.warning(f"⚠️ API returned status {response.status}")
-                            
+                        if __debug__ and CFG.SAVE_RAW_API_RESPONSES:
+                            self.save_raw_response(body)
+                        data = orjson.loads(body)
+                        self._last_body_digest = digest
+                        actions = data.get('actions', [])
+                        logger.info("📊 Fetched %s actions from API", len(actions))
+                        return actions
+                    elif response.status == 401:
+                        logger.warning("🔐 Authorization failed - token expired")
+                        self.request_token_refresh()
+                        return None
+                    else:
+                        logger.warning("⚠️ API returned status %s", response.status)
+                        
+            except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+                logger.error("💥 Request failed (attempt %s): %s", attempt + 1, e)
             except Exception as e:
-                logger.error(f"💥 Request failed (attempt {attempt + 1}): {e}")
-                if attempt < self.retry_attempts - 1:
-                    await asyncio.sleep(2 ** attempt)
+                logger.error(f"💥 Unexpected request error: {e}")
+                return None
+            
+            # Transient failure (network error or non-401 status): back off before retrying
+            if attempt < self.retry_attempts - 1:
+                await asyncio.sleep(backoff_delay(attempt))
         
         return None
     
-    async def send_telegram_message(self, message: str) -> bool:
-        """Send message to Telegram channel"""
+    def save_raw_response(self, body: bytes):
+        """Dump a raw API response for debugging (stripped out under python -O)"""
         try:
-            # Send the message first
-            sent_message = await self.bot.send_message(
-                chat_id=self.channel_username, 
-                text=message,
-                parse_mode=ParseMode.HTML
-            )
-            logger.info("📢 Message sent successfully to Telegram")
+            os.makedirs('raw_responses', exist_ok=True)
+            filename = datetime.now().strftime('actions_%Y%m%d_%H%M%S_%f.json')
+            with open(os.path.join('raw_responses', filename), 'wb') as f:
+                f.write(body)
+        except Exception as e:
+            logger.warning(f"Could not save raw API response: {e}")
+    
+    async def pause_sending(self, seconds: float):
+        """Halt the whole send queue for a flood-control wait, then return"""
+        loop = asyncio.get_running_loop()
+        self._pause_until = max(self._pause_until, loop.time() + seconds)
+        await self._wait_if_paused()
+    
+    async def _wait_if_paused(self):
+        delay = self._pause_until - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def _sender_worker(self):
+        """Send queued notifications one at a time, honouring the rate limiters and flood waits"""
+        while True:
+            message, label, pin_amount = await self._send_q.get()
+            try:
+                await self._wait_if_paused()
+                message_obj = await self.send_telegram_message(message)
+                
+                if message_obj:
+                    logger.info("✅ Sent: %s", label)
+                    await self.pin_message_if_high_value(message_obj, pin_amount)
+                else:
+                    logger.error("❌ Failed to send: %s", label)
+            except Exception as e:
+                logger.error("💥 Error sending notification: %s", e)
+            finally:
+                self._send_q.task_done()
+    
+    async def send_telegram_message(self, message: str) -> bool:
+        """Send message to Telegram channel (user client if authenticated, else Bot API)"""
+        # One hourly slot per notification, even when the Bot API fallback sends it
+        async with self.hour_limiter:
+            if self.user_client:
+                sent_message = await self.send_user_client_message(message)
+                if sent_message:
+                    self.record_message_sent()
+                    return sent_message
+                logger.info("↩️ Falling back to Bot API")
+            
+            sent_message = await self.send_bot_message(message)
+            if sent_message:
+                self.record_message_sent()
             return sent_message
-        except TelegramRetryAfter as e:
-            logger.warning(f"⏰ Rate limit exceeded, waiting {e.retry_after} seconds...")
-            await asyncio.sleep(e.retry_after)
-            return await self.send_telegram_message(message)
-        except TelegramAPIError as e:
-            logger.error(f"❌ Telegram API error: {e}")
-            return False
+    
+    async def send_bot_message(self, message: str):
+        """Send message through the Bot API, retrying flood waits and network errors"""
+        for attempt in range(self.retry_attempts):
+            try:
+                # Wait for a free slot in the global and per-minute buckets
+                async with self.global_limiter, self.minute_limiter:
+                    sent_message = await self.bot.send_message(
+                        chat_id=self._chat_id, 
+                        text=message,
+                        parse_mode=ParseMode.HTML
+                    )
+                logger.info("📢 Message sent successfully to Telegram")
+                return sent_message
+            except TelegramRetryAfter as e:
+                logger.warning("⏰ Rate limit exceeded, waiting %s seconds...", e.retry_after)
+                await self.pause_sending(e.retry_after)
+            except TelegramNetworkError as e:
+                if attempt < self.retry_attempts - 1:
+                    delay = backoff_delay(attempt)
+                    logger.warning("🌐 Network error sending message, retrying in %.1fs: %s", delay, e)
+                    await asyncio.sleep(delay)
+                else:
+                    logger.error(f"❌ Telegram network error: {e}")
+            except TelegramAPIError as e:
+                logger.error(f"❌ Telegram API error: {e}")
+                return False
+        return None
 
+    async def send_user_client_message(self, message: str):
+        """Send message through the MTProto user session (higher limits, premium emoji support)"""
+        for _ in range(self.retry_attempts):
+            try:
+                async with self.mtproto_minute_limiter:
+                    sent_message = await self.user_client.send_message(
+                        self._channel_entity,
+                        message,
+                        parse_mode='html'
+                    )
+                logger.info("📢 Message sent successfully to Telegram (user client)")
+                return sent_message
+            except FloodWaitError as e:
+                logger.warning("⏰ Flood wait, waiting %s seconds...", e.seconds)
+                await self.pause_sending(e.seconds)
+            except RPCError as e:
+                logger.error(f"❌ Telegram user client error: {e}")
+                return False
+            except OSError as e:
+                # Telethon raises ConnectionError while disconnected
+                logger.error(f"❌ Telegram user client connection error: {e}")
+                return False
+        return None
+    
     async def pin_message_if_high_value(self, message_obj, purchase_amount: float):
         """Pin message if purchase amount is above threshold"""
         try:
-            if purchase_amount >= config.PIN_MESSAGE_THRESHOLD:
-                await self.bot.pin_chat_message(
-                    chat_id=self.channel_username,
-                    message_id=message_obj.message_id,
-                    disable_notification=False  # Send notification about pinning
-                )
-                logger.info(f"📌 Pinned high-value message: {purchase_amount} TON")
+            if price_tier(purchase_amount) >= TIER_PIN:
+                if isinstance(message_obj, Message):
+                    await self.bot.pin_chat_message(
+                        chat_id=self._chat_id,
+                        message_id=message_obj.message_id,
+                        disable_notification=False  # Send notification about pinning
+                    )
+                else:
+                    # Sent through the user client
+                    await self.user_client.pin_message(self._channel_entity, message_obj, notify=True)
+                logger.info("📌 Pinned high-value message: %s TON", purchase_amount)
                 return True
-        except TelegramAPIError as e:
+        except (TelegramAPIError, RPCError) as e:
             logger.error(f"❌ Failed to pin message: {e}")
         except Exception as e:
             logger.error(f"💥 Error pinning message: {e}")
         return False
     
-    async def process_new_actions(self, actions: List[Dict]):
-        """Smart batch processing: send first 5 gifts immediately, then real-time monitoring"""
+    def mark_action_seen(self, action_id: int):
+        """Remember an API action id in both the exact LRU and the Bloom filter"""
+        self.recent_actions.put(action_id, True)
+        self.seen_actions.add(action_id)
+        self._journal_write({'op': 'seen', 'id': action_id})
+    
+    async def process_new_actions(self, actions: List[Dict]) -> bool:
+        """Smart batch processing: send first 5 gifts immediately, then real-time monitoring.
+        
+        Returns True if any actions were new.
+        """
         if not actions:
-            return
+            return False
             
         # Filter only purchase actions and sort by timestamp (newest first)
         purchase_actions = [a for a in actions if a.get('type') == 'purchase']
         if not purchase_actions:
-            return
+            return False
             
-        new_actions = []
-        for action in purchase_actions:
-            action_id = f"{action['nft']['id']}_{action['created_at']}_{action['amount']}"
-            if action_id not in self.seen_actions:
+        new_actions: List[ParsedAction] = []
+        for raw_action in purchase_actions:
+            try:
+                action = ParsedAction.parse(raw_action)
+            except Exception as e:
+                # Skip a malformed action for good instead of failing on it every poll
+                nft = raw_action.get('nft') or {}
+                bad_id = action_key(nft.get('id'), raw_action.get('created_at'), raw_action.get('amount'))
+                if bad_id not in self.recent_actions and bad_id not in self.seen_actions:
+                    logger.warning("⚠️ Skipping malformed action (%r): %s", e, raw_action)
+                    self.mark_action_seen(bad_id)
+                continue
+            if action.action_id not in self.recent_actions and action.action_id not in self.seen_actions:
                 new_actions.append(action)
-                self.seen_actions.add(action_id)
+                self.mark_action_seen(action.action_id)
         
         if not new_actions:
             # No new actions, we're in waiting mode
             if not self.waiting_for_new_sales:
                 logger.info("💤 No new sales detected, entering waiting mode...")
                 self.waiting_for_new_sales = True
-            return
+            return False
         
         # Reset waiting mode when we find new sales
         if self.waiting_for_new_sales:
@@ -440,21 +1007,15 @@ class TelegramNFTMonitor:
         # Initial batch: send first 5 gifts immediately
         if not self.initial_batch_sent:
             batch_to_send = new_actions[:5]  # Take first 5
-            logger.info(f"🚀 Sending initial batch of {len(batch_to_send)} gifts...")
+            logger.info("🚀 Sending initial batch of %s gifts...", len(batch_to_send))
             
             for action in batch_to_send:
                 await self.send_single_notification(action)
-                # Very short delay for initial batch
-                await asyncio.sleep(1)
             
             self.initial_batch_sent = True
             if new_actions:
-                self.last_processed_timestamp = new_actions[0].get('created_at')
-            
-            # If there were more than 5, mark the rest as seen but don't send
-            for action in new_actions[5:]:
-                action_id = f"{action['nft']['id']}_{action['created_at']}_{action['amount']}"
-                self.seen_actions.add(action_id)
+                self.last_processed_timestamp = new_actions[0].ts
+            # Any beyond the first 5 were already marked seen above and are not sent
                 
         else:
             # Real-time mode: send new purchases immediately as they occur
@@ -462,175 +1023,200 @@ class TelegramNFTMonitor:
             
             if self.last_processed_timestamp:
                 for action in new_actions:
-                    action_timestamp = action.get('created_at')
-                    if action_timestamp and action_timestamp > self.last_processed_timestamp:
+                    if action.ts and action.ts > self.last_processed_timestamp:
                         truly_new_actions.append(action)
             else:
                 truly_new_actions = new_actions
             
-            if truly_new_actions:
-                logger.info(f"⚡ Sending {len(truly_new_actions)} new purchases in real-time...")
+            if len(truly_new_actions) > CFG.BATCH_THRESHOLD:
+                # Burst: coalesce sales into digests instead of one message each
+                step = CFG.DIGEST_MAX_SALES
+                logger.info("📦 Burst of %s new purchases, sending digests...", len(truly_new_actions))
+                
+                for i in range(0, len(truly_new_actions), step):
+                    await self.send_digest_notification(truly_new_actions[i:i + step])
+                
+                self.last_processed_timestamp = truly_new_actions[0].ts
+            
+            elif truly_new_actions:
+                logger.info("⚡ Sending %s new purchases in real-time...", len(truly_new_actions))
                 
                 for action in truly_new_actions:
                     await self.send_single_notification(action)
-                    # Minimal delay for real-time notifications
-                    await asyncio.sleep(0.5)
                 
                 # Update last processed timestamp
-                self.last_processed_timestamp = truly_new_actions[0].get('created_at')
+                self.last_processed_timestamp = truly_new_actions[0].ts
         
-        self.save_state()
+        await self.save_state()
+        return True
 
-    async def send_single_notification(self, action: Dict):
-        """Send notification for a single purchase"""
+    async def send_single_notification(self, action: ParsedAction):
+        """Queue the notification for a single purchase"""
         try:
             is_duplicate, is_price_change = self.is_duplicate_or_price_change(action)
             
             if is_duplicate:
-                logger.info(f"Skipping duplicate: {action['nft']['name']}")
+                logger.info("Skipping duplicate: %s", action.name)
                 return
             
             if is_price_change:
-                logger.info(f"Price change detected: {action['nft']['name']}")
+                logger.info("Price change detected: %s", action.name)
+            
+            # Update price history when queueing so later copies of the
+            # same sale are seen as duplicates before this one is sent
+            self.update_price_history(action)
             
             message = self.format_message(action)
-            message_obj = await self.send_telegram_message(message)
+            await self._send_q.put((message, f"{action.name} for {action.price} TON", action.price))
             
-            if message_obj:
-                purchase_amount = float(action['amount'])
-                logger.info(f"✅ Sent: {action['nft']['name']} for {purchase_amount} TON")
-                await self.pin_message_if_high_value(message_obj, purchase_amount)
-            else:
-                logger.error(f"❌ Failed to send: {action['nft']['name']}")
+        except Exception as e:
+            logger.error("💥 Error queueing notification: %s", e)
+    
+    async def send_digest_notification(self, actions: List[ParsedAction]):
+        """Queue several purchases as one digest message (used during bursts)"""
+        try:
+            to_send = []
+            for action in actions:
+                is_duplicate, _ = self.is_duplicate_or_price_change(action)
+                if is_duplicate:
+                    logger.info("Skipping duplicate: %s", action.name)
+                    continue
+                self.update_price_history(action)
+                to_send.append(action)
+            
+            if not to_send:
+                return
             
-            # Update price history
-            action_id = f"{action['nft']['id']}_{action['created_at']}_{action['amount']}"
-            self.update_price_history(action, action_id)
+            message = self.format_digest(to_send)
+            top_amount = max(action.price for action in to_send)
+            await self._send_q.put((message, f"digest of {len(to_send)} purchases (top {top_amount} TON)",
+                                    top_amount))
             
         except Exception as e:
-            logger.error(f"💥 Error sending notification: {e}")
+            logger.error("💥 Error queueing digest: %s", e)
     
-    def format_message(self, action: dict) -> str:
-        """Format the purchase action into a Telegram message"""
-        nft = action['nft']
-        
-        # Extract NFT details
-        name = nft['name']
-        external_number = nft['external_collection_number']
-        floor_price = nft['floor_price']
-        sold_price = action['amount']
-        created_at = action['created_at']
-        
-        # Format NFT name for URL
-        formatted_name = name.replace(' ', '')
-        nft_url = f"https://t.me/nft/{formatted_name}-{external_number}"
-        
-        # Extract attributes
-        attributes = nft.get('attributes', [])
-        model = next((attr for attr in attributes if attr['type'] == 'model'), None)
-        symbol = next((attr for attr in attributes if attr['type'] == 'symbol'), None)
-        backdrop = next((attr for attr in attributes if attr['type'] == 'backdrop'), None)
-        
-        # Get model emoji if model exists
-        model_emoji = ""
-        if model:
-            logger.info(f"Model found: {model['value']} ({model['rarity_per_mille']}‰)")
-        else:
-            logger.info(f"No model data found")
+    def format_digest(self, actions: List[ParsedAction]) -> str:
+        """Format several purchases into one compact digest message"""
+        lines = [f"┌─📦 {len(actions)} GIFTS SOLD!", "│"]
+        for action in actions:
+            lines.append(f"├ <a href='{action.url}'>{html.escape(action.name)} #{action.ext}</a> — "
+                         f"{action.raw['amount']} TON (floor {action.raw['nft']['floor_price']})")
+        lines.append("│")
+        lines.append(f"└─ Date: {format_timestamp(actions[0].ts)}")
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _build_message_templates(header: str) -> Dict[Tuple[bool, bool, bool], str]:
+        """Build format_map templates around a static header, one per (model, symbol, backdrop) combination"""
+        header_line = "┌─" + html.escape(header).replace('{', '{{').replace('}', '}}')
+        attribute_lines = (
+            "├ Model: {model} ({model_rarity}‰) {emoji}",
+            "├ Symbol: {symbol} ({symbol_rarity}‰)",
+            "├ Backdrop: {backdrop} ({backdrop_rarity}‰)"
+        )
         
-        # Debug log the final emoji
-        logger.info(f"Final model emoji for {name}: '{model_emoji}'")
+        templates = {}
+        for flags in itertools.product((False, True), repeat=3):
+            templates[flags] = "\n".join([
+                "<a href='{nft_url}'>{emoji} {name} #{number}</a>",
+                "",
+                header_line,
+                "│",
+                "├ Gift Name: {emoji} {name}",
+                "├ Floor Price: {floor_price} TON",
+                "├ Sold For: {sold_price} TON",
+                "│",
+                *(line for line, present in zip(attribute_lines, flags) if present),
+                "│",
+                "└─ Date: {date}"
+            ])
+        return templates
+    
+    def format_message(self, action: ParsedAction) -> str:
+        """Format the purchase action into a Telegram message"""
+        attributes = action.attrs
+        model = attributes.get('model')
+        symbol = attributes.get('symbol')
+        backdrop = attributes.get('backdrop')
         
-        # Format date
-        try:
-            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            formatted_date = dt.strftime('%Y-%m-%d %H:%M UTC')
-        except:
-            formatted_date = created_at
-        
-        # Build message with decorative box design and hyperlinked name with emoji
-        message_parts = [
-            f"<a href='{nft_url}'>{model_emoji} {name} #{external_number}</a>",
-            "",
-            "┌─🎉 GIFT SOLD!",
-            "│",
-            f"├ Gift Name: {model_emoji} {name}",
-            f"├ Floor Price: {floor_price} TON",
-            f"├ Sold For: {sold_price} TON",
-            "│"
-        ]
-        
-        # Add attributes if available
+        fields = {
+            'nft_url': action.url,
+            'name': html.escape(action.name),
+            'number': action.ext,
+            'floor_price': action.raw['nft']['floor_price'],
+            'sold_price': action.raw['amount'],
+            'date': format_timestamp(action.ts)
+        }
         if model:
-            message_parts.append(f"├ Model: {model['value']} ({model['rarity_per_mille']}‰) {model_emoji}")
+            fields['model'] = html.escape(model['value'])
+            fields['model_rarity'] = model['rarity_per_mille']
         if symbol:
-            message_parts.append(f"├ Symbol: {symbol['value']} ({symbol['rarity_per_mille']}‰)")
+            fields['symbol'] = html.escape(symbol['value'])
+            fields['symbol_rarity'] = symbol['rarity_per_mille']
         if backdrop:
-            message_parts.append(f"├ Backdrop: {backdrop['value']} ({backdrop['rarity_per_mille']}‰)")
+            fields['backdrop'] = html.escape(backdrop['value'])
+            fields['backdrop_rarity'] = backdrop['rarity_per_mille']
         
-        message_parts.extend([
-            "│",
-            f"└─ Date: {formatted_date}"
-        ])
+        # Pick the emoji and header template by price tier
+        tier = price_tier(action.price)
+        fields['emoji'] = self._tier_emojis[tier]
         
-        return "\n".join(message_parts)
+        return self._templates[tier][(bool(model), bool(symbol), bool(backdrop))].format_map(fields)
     
     async def monitoring_loop(self):
         """Main monitoring loop with smart waiting and batch processing"""
         logger.info("🚀 Starting NFT monitoring loop...")
         consecutive_failures = 0
         max_consecutive_failures = 3
-        token_refresh_counter = 0
+        
+        # Settings are frozen, bind them once outside the loop
+        debug_mode = __debug__ and CFG.DEBUG_MODE
+        poll_min, poll_max = CFG.POLL_MIN_INTERVAL, CFG.POLL_MAX_INTERVAL
         
         while self.running:
             try:
-                # Check if token needs refresh
-                if (self.token_last_updated and 
-                    (datetime.now() - self.token_last_updated).total_seconds() > self.token_refresh_interval) or \
-                   token_refresh_counter >= 720:
-                    logger.info("🔄 Periodic token refresh...")
-                    await self.extract_fresh_token()
-                    token_refresh_counter = 0
-                
-                # Ensure we have a valid token
-                if not await self.ensure_valid_token():
-                    logger.error("❌ No valid token available, retrying in 10 seconds...")
-                    await asyncio.sleep(10)
-                    consecutive_failures += 1
-                    if consecutive_failures >= max_consecutive_failures:
-                        logger.error("💥 Too many consecutive failures, stopping...")
-                        break
-                    continue
+                # Wait for the background refresher to publish a valid token
+                if not self._token_ready.is_set():
+                    logger.info("⏳ Waiting for authorization token...")
+                    try:
+                        await asyncio.wait_for(self._token_ready.wait(), timeout=120)
+                    except asyncio.TimeoutError:
+                        # The refresher counts failed extractions; a slow first login is not one
+                        if self.token_refresh_failures >= max_consecutive_failures:
+                            logger.error("💥 Too many failed token extractions, stopping...")
+                            break
+                        logger.error("❌ No valid token available yet")
+                        continue
                 
                 # Fetch market actions
                 actions = await self.fetch_market_actions()
                 
+                # One clock reading per tick, shared by expiry, history updates and last_check_time
+                now = self._tick_now = time.time()
+                
+                # Forget sales older than the duplicate memory window
+                self.expire_price_history(now)
+                
                 if actions is not None:
                     # Process actions with smart batch logic
-                    await self.process_new_actions(actions)
+                    found_new = await self.process_new_actions(actions)
                     consecutive_failures = 0
-                    token_refresh_counter += 1
+                    if found_new:
+                        self._poll = max(poll_min, self._poll * 0.5)
+                    else:
+                        self._poll = min(poll_max, self._poll * 1.3)
                 else:
+                    # An expired token already triggered a background refresh
                     logger.warning("⚠️ Failed to fetch market actions")
-                    consecutive_failures += 1
-                    if consecutive_failures >= 1:
-                        logger.info("🔄 Attempting token refresh due to API failures...")
-                        await self.extract_fresh_token()
-                        consecutive_failures = 0
-                        token_refresh_counter = 0
                 
-                self.last_check_time = datetime.now().isoformat()
+                self.last_check_time = datetime.fromtimestamp(now).isoformat()
                 
-                # Smart waiting: faster checks when expecting new sales, slower when waiting
-                if self.waiting_for_new_sales:
-                    # Slower checks when no new sales expected (every 10 seconds)
-                    await asyncio.sleep(10)
-                elif not self.initial_batch_sent:
-                    # Very fast checks during initial batch discovery (every 2 seconds)
-                    await asyncio.sleep(2)
+                # Event-driven waiting: check the API only when the Portals channel posts
+                if self.user_client and self.initial_batch_sent and not debug_mode:
+                    await self.wait_for_market_event()
+                # Adaptive polling, jittered so checks do not fall into lockstep
                 else:
-                    # Normal real-time monitoring (every 5 seconds)
-                    await asyncio.sleep(self.sleep_interval)
+                    await asyncio.sleep(self._poll * random.uniform(0.8, 1.2))
                 
             except KeyboardInterrupt:
                 logger.info("👋 Shutdown requested by user")
@@ -646,19 +1232,171 @@ class TelegramNFTMonitor:
                 # Reduced backoff on errors for faster recovery
                 await asyncio.sleep(min(30, 5 * consecutive_failures))
     
+    def request_token_refresh(self):
+        """Mark the current token unusable and wake the background refresher"""
+        self._token_ready.clear()
+        self._refresh_requested.set()
+    
+    async def _refresh_loop(self):
+        """Keep a valid token available in the background so polling never waits on the browser"""
+        if self._token_ready.is_set():
+            logger.info("🔑 Using cached session token, skipping browser extraction")
+        elif await self.ensure_valid_token():
+            self._token_ready.set()
+        else:
+            self.token_refresh_failures = 1
+        
+        while self.running:
+            delay = self._next_refresh_delay()
+            try:
+                await asyncio.wait_for(self._refresh_requested.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_requested.clear()
+            if not self.running:
+                break
+            
+            logger.info("🔄 Refreshing authorization token in background...")
+            if await self.extract_fresh_token():
+                self.token_refresh_failures = 0
+                self._token_ready.set()
+            else:
+                if not self._token_ready.is_set():
+                    self.token_refresh_failures += 1
+                logger.error("❌ Background token refresh failed, retrying in %.0f seconds...",
+                             self._next_refresh_delay())
+    
+    def _next_refresh_delay(self) -> float:
+        """Refresh a minute before the token gets old; retry sooner while no token is usable"""
+        if self._token_ready.is_set() and self.token_last_updated:
+            age = (datetime.now() - self.token_last_updated).total_seconds()
+            return max(60, self.token_refresh_interval - 60 - age)
+        return 10
+    
+    async def wait_for_market_event(self):
+        """Wait for a Portals channel post, falling back to a poll after EVENT_FALLBACK_INTERVAL"""
+        try:
+            await asyncio.wait_for(self.market_event.wait(), timeout=CFG.EVENT_FALLBACK_INTERVAL)
+            logger.info("📨 Portals channel event received, checking market...")
+        except asyncio.TimeoutError:
+            logger.info("⏰ No channel events, running fallback check...")
+        self.market_event.clear()
+    
+    async def _on_portals_message(self, event):
+        """Telethon handler for new Portals channel posts"""
+        self.market_event.set()
+    
+    def _create_user_client(self) -> Optional[TelegramClient]:
+        """Create the Telethon user client if API credentials are configured"""
+        if not CFG.TELEGRAM_API_ID or not CFG.TELEGRAM_API_HASH or 'YOUR' in CFG.TELEGRAM_API_HASH:
+            return None
+        return TelegramClient(CFG.TELEGRAM_SESSION_NAME, CFG.TELEGRAM_API_ID, CFG.TELEGRAM_API_HASH)
+    
+    async def authenticate_telegram_interactive(self) -> bool:
+        """Log in the Telegram user account, prompting for phone number and code in the console"""
+        if not self.user_client:
+            self.user_client = self._create_user_client()
+        if not self.user_client:
+            logger.error("❌ TELEGRAM_API_ID / TELEGRAM_API_HASH are not configured in config.py")
+            return False
+        
+        try:
+            await self.user_client.start()
+            me = await self.user_client.get_me()
+            logger.info(f"✅ Telegram user authenticated: {me.username or me.id}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Telegram authentication failed: {e}")
+            return False
+    
+    async def start_user_client(self) -> bool:
+        """Connect the authenticated user client and subscribe to Portals channel posts"""
+        client = self._create_user_client()
+        if not client:
+            logger.info("ℹ️ Telegram user client not configured, using API polling")
+            return False
+        
+        try:
+            await client.connect()
+            if not await client.is_user_authorized():
+                logger.warning("🔐 Telegram user session not authorized - run authenticate_telegram.py first")
+                await client.disconnect()
+                return False
+        except Exception as e:
+            logger.error(f"❌ Failed to connect Telegram user client: {e}")
+            return False
+        
+        client.add_event_handler(self._on_portals_message, events.NewMessage(chats=CFG.PORTALS_EVENT_CHANNEL))
+        self.user_client = client
+        logger.info(f"📡 Subscribed to @{CFG.PORTALS_EVENT_CHANNEL} channel events")
+        
+        if CFG.PREMIUM_EMOJI_BY_TIER:
+            self._tier_emojis = tuple(
+                f'<tg-emoji emoji-id="{emoji_id}">{fallback}</tg-emoji>'
+                for emoji_id, fallback in zip(CFG.PREMIUM_EMOJI_BY_TIER, CFG.STD_EMOJI_BY_TIER)
+            )
+        return True
+    
+    async def resolve_channel(self):
+        """Resolve CHANNEL_USERNAME once so sends target the numeric chat id"""
+        try:
+            chat = await self.bot.get_chat(self.channel_username)
+            self._chat_id = chat.id
+            logger.info(f"📢 Resolved {self.channel_username} to chat id {chat.id}")
+        except TelegramAPIError as e:
+            logger.warning(f"⚠️ Could not resolve channel for Bot API, using username: {e}")
+        
+        if self.user_client:
+            try:
+                self._channel_entity = await self.user_client.get_input_entity(self.channel_username)
+            except (RPCError, ValueError) as e:
+                logger.warning(f"⚠️ Could not resolve channel for user client, using username: {e}")
+    
     async def cleanup(self):
         """Clean up resources"""
         logger.info("🧹 Cleaning up resources...")
         
+        # Let queued notifications go out before the sessions close
+        if self._sender_task and not self._sender_task.done():
+            try:
+                await asyncio.wait_for(self._send_q.join(), timeout=30)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Dropping {self._send_q.qsize()} queued notifications")
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+        
+        # Stop the background token refresher
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        await self._reap_extractor()
+        
         try:
             # Close bot session
             await self.bot.session.close()
             logger.info("📱 Telegram bot session closed")
+            
+            # Close shared HTTP session
+            if self.http and not self.http.closed:
+                await self.http.close()
+                logger.info("🌐 HTTP session closed")
+            
+            # Disconnect user client
+            if self.user_client and self.user_client.is_connected():
+                await self.user_client.disconnect()
+                logger.info("👤 Telegram user client disconnected")
                 
         except Exception as e:
             logger.warning(f"⚠️ Error during cleanup: {e}")
         
-        self.save_state()
+        await self.save_state(compact=True)
+        self._journal.close()
         logger.info("✅ Cleanup completed")
     
     async def run(self):
@@ -667,22 +1405,31 @@ class TelegramNFTMonitor:
         logger.info("🎯 Starting Telegram NFT Market Monitor - Bot Version")
         logger.info(f"📡 Monitoring: {self.api_url}")
         logger.info(f"📢 Telegram Channel: {self.channel_username}")
-        logger.info(f"⏱️ Check Interval: {self.sleep_interval} seconds")
-        logger.info(f"🛡️ Rate Limits: {config.MAX_MESSAGES_PER_MINUTE}/min, {config.MAX_MESSAGES_PER_HOUR}/hour, {config.MAX_DAILY_MESSAGES}/day")
+        logger.info(f"⏱️ Check Interval: {CFG.POLL_MIN_INTERVAL}-{CFG.POLL_MAX_INTERVAL} seconds, adaptive (event fallback: {CFG.EVENT_FALLBACK_INTERVAL} seconds)")
+        logger.info(f"🛡️ Rate Limits: {CFG.MAX_MESSAGES_PER_MINUTE}/min, {CFG.MAX_MESSAGES_PER_HOUR}/hour, {CFG.MAX_DAILY_MESSAGES}/day")
         
         try:
             # Try to load existing token first
-            if os.path.exists('auth_token.txt'):
-                try:
-                    with open('auth_token.txt', 'r') as f:
-                        self.auth_token = f.read().strip()
-                    logger.info("📁 Loaded existing token from file")
-                except Exception as e:
-                    logger.error(f"💥 Error loading token: {e}")
+            if await self.read_token_file():
+                self.auth_token = self._token_file_token
+                logger.info("📁 Loaded existing token from file")
+            
+            # Token refresh and message sending run alongside monitoring. The refresher
+            # starts before the Telegram connections so a token extraction overlaps them.
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+            self._sender_task = asyncio.create_task(self._sender_worker())
             
             # Cleanup old price history
             self.cleanup_old_price_history()
             
+            # Subscribe to Portals channel events (falls back to polling if unavailable)
+            if __debug__ and CFG.DEBUG_MODE:
+                logger.info("🐛 DEBUG_MODE enabled, using API polling")
+            else:
+                await self.start_user_client()
+            
+            await self.resolve_channel()
+            
             # Start monitoring
             await self.monitoring_loop()
             
@@ -691,301 +1438,211 @@ class TelegramNFTMonitor:
         finally:
             await self.cleanup()
 
-    def load_auth_token(self):
+    @staticmethod
+    def _read_token_file_sync(known_mtime: float) -> Tuple[float, Optional[str]]:
+        """Stat TOKEN_FILE and read it only if it changed since known_mtime (runs in a thread).
+        
+        Returns (mtime, token); token is None when the file was left unread.
+        """
+        mtime = os.stat(TOKEN_FILE).st_mtime
+        if mtime == known_mtime:
+            return mtime, None
+        with open(TOKEN_FILE, 'r') as f:
+            return mtime, f.read().strip()
+    
+    async def read_token_file(self) -> bool:
+        """Refresh the cached token file state, at most once per TOKEN_STAT_TTL.
+        
+        The file is only re-read when its mtime changes. Returns True if it holds a token.
+        """
+        now = time.monotonic()
+        if now - self._token_checked_at >= TOKEN_STAT_TTL:
+            self._token_checked_at = now
+            try:
+                mtime, token = await asyncio.to_thread(self._read_token_file_sync, self._token_file_mtime)
+                if token is not None:
+                    self._token_file_token = token or None
+                    self._token_file_mtime = mtime
+            except FileNotFoundError:
+                self._token_file_token = None
+                self._token_file_mtime = 0.0
+            except Exception as e:
+                logger.warning(f"Could not read token file: {e}")
+        return self._token_file_token is not None
+    
+    async def load_auth_token(self):
         """Load auth token from file if exists and not expired"""
-        try:
-            if os.path.exists('auth_token.txt'):
-                # Check file age
-                file_age = datetime.now() - datetime.fromtimestamp(os.path.getmtime('auth_token.txt'))
-                if file_age.total_seconds() < self.token_refresh_interval:
-                    with open('auth_token.txt', 'r') as f:
-                        token = f.read().strip()
-                        if token:
-                            self.auth_token = token
-                            self.token_last_updated = datetime.fromtimestamp(os.path.getmtime('auth_token.txt'))
-                            logger.info("✅ Loaded valid auth token from file")
-                            return True
-                else:
-                    logger.info("⏰ Token file is old, will refresh")
-            return False
-        except Exception as e:
-            logger.warning(f"Could not load token from file: {e}")
+        if not await self.read_token_file():
             return False
+        if time.time() - self._token_file_mtime < self.token_refresh_interval:
+            self.auth_token = self._token_file_token
+            self.token_last_updated = datetime.fromtimestamp(self._token_file_mtime)
+            logger.info("✅ Loaded valid auth token from file")
+            return True
+        logger.info("⏰ Token file is old, will refresh")
+        return False
+    
+    @staticmethod
+    def _write_token_file_sync(token: str, unchanged: bool) -> float:
+        """Atomically replace TOKEN_FILE (or just touch it if unchanged); returns the new mtime"""
+        if unchanged:
+            try:
+                os.utime(TOKEN_FILE)
+                return os.stat(TOKEN_FILE).st_mtime
+            except FileNotFoundError:
+                pass
+        tmp_path = TOKEN_FILE + '.tmp'
+        # The token is a bearer credential; os.replace keeps these owner-only permissions
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(tmp_path, 0o600)
+        with open(fd, 'w') as f:
+            f.write(token)
+            f.flush()
+            mtime = os.fstat(f.fileno()).st_mtime
+        # Readers see either the old or the new token, never a partial write
+        os.replace(tmp_path, TOKEN_FILE)
+        return mtime
     
-    def save_auth_token(self, token: str):
-        """Save auth token to file"""
+    async def save_auth_token(self, token: str):
+        """Save auth token to file and the session cache without blocking the event loop"""
+        unchanged = token == self._token_file_token
         try:
-            with open('auth_token.txt', 'w') as f:
-                f.write(token)
+            mtime = await asyncio.to_thread(self._write_token_file_sync, token, unchanged)
+            # We wrote the file ourselves, so the cache is current without another read
+            self._token_file_token = token
+            self._token_file_mtime = mtime
+            self._token_checked_at = time.monotonic()
             self.token_last_updated = datetime.now()
-            logger.info("💾 Token saved to file")
+            if unchanged:
+                logger.info("💾 Token file refreshed (unchanged)")
+            else:
+                self.token_rotations += 1
+                logger.info("💾 Token saved to file (rotation %s)", self.token_rotations)
         except Exception as e:
             logger.warning(f"Could not save token to file: {e}")
-
-    async def setup_browser(self) -> bool:
-        """Initialize Playwright browser for token extraction"""
+        await asyncio.to_thread(self.save_session_cache, token)
+    
+    def load_session_cache(self) -> bool:
+        """Load the cached session token if it is younger than TOKEN_MAX_AGE"""
+        path = os.path.expanduser(CFG.SESSION_CACHE_PATH)
         try:
-            logger.info("🌐 Setting up browser for token extraction...")
-            self.playwright = await async_playwright().start()
-            
-            # Use persistent browser data to avoid logout
-            user_data_dir = os.path.join(os.getcwd(), "browser_data")
-            os.makedirs(user_data_dir, exist_ok=True)
-            
-            # Launch browser with persistent session
-            self.browser = await self.playwright.chromium.launch_persistent_context(
-                user_data_dir=user_data_dir,
-                headless=False,  # Keep visible for debugging
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-extensions',
-                    '--no-first-run',
-                    '--disable-default-apps',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--start-maximized',  # Start maximized
-                    '--disable-infobars',
-                    '--disable-notifications'
-                ],
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080},
-                ignore_default_args=['--enable-automation']  # Remove automation indicators
-            )
-            
-            # The context is the browser itself in persistent mode
-            self.context = self.browser
-            
-            # Enable request interception to capture auth tokens
-            await self.context.route("**/*", self._intercept_requests)
-            
-            self.page = await self.context.new_page()
-            
-            # Maximize the page window
-            await self.page.set_viewport_size({"width": 1920, "height": 1080})
-            
-            logger.info("✅ Browser setup completed - Chrome should be fully visible")
+            if not os.path.exists(path):
+                return False
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
+            token, saved_at = data.get('auth_token'), data.get('saved_at', 0)
+            if not token or time.time() - saved_at >= CFG.TOKEN_MAX_AGE:
+                logger.info("⏰ Cached session is old, will refresh")
+                return False
+            self.auth_token = token
+            self.token_last_updated = datetime.fromtimestamp(saved_at)
+            self._token_ready.set()
+            logger.info("📁 Loaded cached session token")
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Failed to setup browser: {e}")
+            logger.warning(f"Could not load session cache: {e}")
             return False
-
-    async def _intercept_requests(self, route):
-        """Intercept network requests to capture authorization tokens"""
-        request = route.request
-        
-        # Check if this is a request to Portals Market API
-        if 'portals-market.com/api' in request.url and 'actions' in request.url:
-            headers = request.headers
-            auth_header = headers.get('authorization', '')
-            
-            if auth_header and ('tma ' in auth_header or 'query_id=' in auth_header):
-                # Ensure we have the full token with 'tma ' prefix
-                if not auth_header.startswith('tma '):
-                    new_token = f'tma {auth_header}'
-                else:
-                    new_token = auth_header
-                    
-                if new_token != self.auth_token:
-                    self.auth_token = new_token
-                    self.save_auth_token(new_token)
-                    logger.info("🔑 Captured fresh authorization token!")
-                    logger.info(f"🔍 Token preview: {new_token[:50]}...")
-        
-        # Continue with the request
-        await route.continue_()
+    
+    def save_session_cache(self, token: str):
+        """Persist the token so the next process can skip extraction"""
+        path = os.path.expanduser(CFG.SESSION_CACHE_PATH)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # The file holds a bearer token, so keep it readable by the owner only
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.chmod(path, 0o600)
+            with open(fd, 'wb') as f:
+                f.write(orjson.dumps({'auth_token': token, 'saved_at': time.time()}))
+        except Exception as e:
+            logger.warning(f"Could not save session cache: {e}")
 
     async def extract_fresh_token(self) -> bool:
-        """Extract fresh token by navigating to Portals channel"""
+        """Run extract_token.py in a subprocess so Chromium only lives while a token is captured"""
         if self.token_extraction_in_progress:
             return False
             
         self.token_extraction_in_progress = True
+        proc = relay = None
         
         try:
-            logger.info("🚀 Extracting fresh authorization token...")
-            
-            if not self.page:
-                if not await self.setup_browser():
-                    return False
+            # The previous extractor may still be closing its browser profile
+            await self._reap_extractor()
             
-            # Navigate to Portals channel on Telegram Web
-            portals_url = "https://web.telegram.org/k/#@portals"
-            logger.info(f"🌐 Navigating to: {portals_url}")
+            logger.info("🚀 Starting token extractor subprocess...")
+            # stdout carries only the token; extractor logs are relayed into nft_monitor.log
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, EXTRACTOR_SCRIPT,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            relay = asyncio.create_task(self._relay_extractor_logs(proc.stderr))
+            # The token line arrives before the extractor shuts Chromium down
+            token_line = await asyncio.wait_for(proc.stdout.readline(), timeout=CFG.TOKEN_EXTRACT_TIMEOUT)
+            token = token_line.decode().strip()
             
-            try:
-                # Set referrer to match the expected flow
-                await self.page.set_extra_http_headers({
-                    'Referer': 'https://portals-market.com/market-activity'
-                })
-                
-                await self.page.goto(portals_url, wait_until='networkidle', timeout=60000)
-                await asyncio.sleep(5)
-                
-                # Check current URL to see if we need login
-                current_url = self.page.url
-                logger.info(f"📍 Current URL: {current_url}")
-                
-                # If redirected to login, wait for user
-                if 'login' in current_url.lower() or 'auth' in current_url.lower():
-                    logger.info("🔐 Please complete login in the browser window...")
-                    logger.info("⏳ Waiting for login completion and navigation to Portals...")
-                    
-                    # Wait for redirect to Portals
-                    login_timeout = 180  # 3 minutes
-                    start_time = time.time()
-                    
-                    while time.time() - start_time < login_timeout:
-                        current_url = self.page.url
-                        if '@portals' in current_url or 'portals' in current_url.lower():
-                            logger.info("✅ Successfully navigated to Portals channel")
-                            break
-                        await asyncio.sleep(3)
-                    else:
-                        logger.error("⏰ Login/navigation timeout")
-                        return False
-                
-                # Wait for the channel to load
-                logger.info("⏳ Waiting for Portals channel to load...")
-                await asyncio.sleep(5)
-                
-                # Look for the "VIEW IN TELEGRAM" button or similar elements
-                try:
-                    # Try to find and click the "VIEW IN TELEGRAM" button
-                    view_button_selectors = [
-                        'button:has-text("VIEW IN TELEGRAM")',
-                        'a:has-text("VIEW IN TELEGRAM")',
-                        '[class*="view"]:has-text("TELEGRAM")',
-                        'button[class*="btn"]',
-                        '.btn-primary'
-                    ]
-                    
-                    for selector in view_button_selectors:
-                        try:
-                            element = await self.page.wait_for_selector(selector, timeout=5000)
-                            if element:
-                                await element.click()
-                                logger.info(f"🖱️ Clicked: {selector}")
-                                await asyncio.sleep(3)
-                                break
-                        except:
-                            continue
-                    
-                    # Wait for potential redirect to portals-market.com
-                    await asyncio.sleep(5)
-                    current_url = self.page.url
-                    logger.info(f"📍 After click, URL: {current_url}")
-                    
-                    # If we're now on portals-market.com, great!
-                    if 'portals-market.com' in current_url:
-                        logger.info("✅ Successfully navigated to Portals Market!")
-                        await asyncio.sleep(5)  # Wait for the page to fully load
-                        
-                        # Try to navigate to market activity page
-                        try:
-                            await self.page.goto('https://portals-market.com/market-activity', wait_until='networkidle')
-                            await asyncio.sleep(5)
-                            logger.info("📊 Navigated to market activity page")
-                        except:
-                            logger.info("📊 Staying on current portals-market.com page")
-                    
-                except Exception as e:
-                    logger.debug(f"Button interaction error: {e}")
-                
-                # Try to interact with the page to trigger API calls
-                try:
-                    # Wait a bit for the page to fully load
-                    await asyncio.sleep(5)
-                    
-                    # Try clicking various elements to trigger API requests
-                    selectors_to_try = [
-                        'button',
-                        '[role="button"]',
-                        '.btn',
-                        'div[onclick]',
-                        'a',
-                        '[class*="button"]',
-                        '[class*="btn"]',
-                        '[class*="market"]',
-                        '[class*="activity"]'
-                    ]
-                    
-                    for selector in selectors_to_try:
-                        try:
-                            elements = await self.page.query_selector_all(selector)
-                            for element in elements[:5]:  # Try first 5 elements
-                                try:
-                                    await element.click()
-                                    await asyncio.sleep(2)
-                                    logger.info(f"🖱️ Clicked element: {selector}")
-                                    if self.auth_token:  # Break if token captured
-                                        break
-                                except:
-                                    continue
-                            if self.auth_token:  # Break if token captured
-                                break
-                        except:
-                            continue
-                    
-                    # Scroll to trigger lazy loading and more API calls
-                    await self.page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    await asyncio.sleep(3)
-                    await self.page.evaluate('window.scrollTo(0, 0)')
-                    await asyncio.sleep(2)
-                    
-                    # Try refreshing the page to trigger more requests
-                    if not self.auth_token:
-                        logger.info("🔄 Refreshing page to trigger more API calls...")
-                        await self.page.reload(wait_until='networkidle')
-                        await asyncio.sleep(5)
-                    
-                except Exception as e:
-                    logger.debug(f"Interaction error: {e}")
-                
-                # Wait for token to be captured
-                wait_time = 0
-                max_wait = 120  # 2 minutes
-                while not self.auth_token and wait_time < max_wait:
-                    await asyncio.sleep(2)
-                    wait_time += 2
-                    if wait_time % 20 == 0:
-                        logger.info(f"⏳ Still waiting for token... ({wait_time}/{max_wait}s)")
-                        # Try another interaction
-                        try:
-                            await self.page.evaluate('window.location.reload()')
-                            await asyncio.sleep(3)
-                        except:
-                            pass
-                
-                if self.auth_token:
-                    logger.info("🎉 Successfully extracted fresh token!")
-                    return True
-                else:
-                    logger.warning("⚠️ Could not capture token automatically")
-                    logger.info("📝 Please interact with the Portals Market app manually to trigger API calls")
-                    logger.info("💡 Try clicking on different sections, scrolling, or refreshing the page")
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"🚨 Navigation error: {e}")
+            if not token:
+                await proc.wait()
+                await relay
+                logger.warning(f"⚠️ Token extractor exited with code {proc.returncode} and no token")
                 return False
-                
+            
+            # Let it finish closing in the background; the next extraction or cleanup reaps it
+            self._extractor_proc, proc = proc, None
+            self._extractor_relay, relay = relay, None
+            self.auth_token = token
+            await self.save_auth_token(token)
+            logger.info("🎉 Successfully extracted fresh token!")
+            return True
+            
+        except asyncio.TimeoutError:
+            logger.error(f"⏰ Token extractor timed out after {CFG.TOKEN_EXTRACT_TIMEOUT}s")
+            return False
         except Exception as e:
             logger.error(f"💥 Token extraction failed: {e}")
             return False
         finally:
+            # Never leave a Chromium process behind
+            if proc and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if relay:
+                await relay
             self.token_extraction_in_progress = False
+    
+    async def _reap_extractor(self):
+        """Wait for an extractor that already delivered its token to exit, killing it if it hangs"""
+        proc, self._extractor_proc = self._extractor_proc, None
+        relay, self._extractor_relay = self._extractor_relay, None
+        if proc is not None and proc.returncode is None:
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=CFG.TOKEN_EXTRACT_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Token extractor did not exit after delivering its token, killing it")
+                proc.kill()
+                await proc.wait()
+        if relay:
+            await relay
+    
+    @staticmethod
+    async def _relay_extractor_logs(stream: asyncio.StreamReader):
+        """Re-log each 'LEVEL:message' line the extractor writes to stderr at its own level"""
+        async for raw in stream:
+            line = raw.decode(errors='replace').rstrip()
+            level_name, sep, message = line.partition(':')
+            level = logging.getLevelName(level_name) if sep else None
+            if isinstance(level, int):
+                logger.log(level, "[extractor] %s", message)
+            elif line:
+                logger.info("[extractor] %s", line)
 
-    def is_token_valid(self) -> bool:
+    async def is_token_valid(self) -> bool:
         """Check if the current token file exists and is recent enough"""
         try:
-            if not os.path.exists('auth_token.txt'):
+            if not await self.read_token_file():
                 return False
             
             # Check file age
-            file_age = time.time() - os.path.getmtime('auth_token.txt')
+            file_age = time.time() - self._token_file_mtime
             # Consider token valid if less than 25 minutes old (instead of 30)
             if file_age < 25 * 60:  # 25 minutes in seconds
                 logger.info("🔑 Token file is recent, skipping browser extraction")
@@ -1009,4 +1666,9 @@ async def main():
         logger.error(f"💥 Fatal error in main: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # libuv-backed event loop where available (not supported on Windows)
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
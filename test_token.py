@@ -5,10 +5,21 @@ Test script to validate Portals Market token extraction and API calls
 
 import asyncio
 import aiohttp
-import json
+import orjson
 from datetime import datetime
 
-async def test_api_call(token):
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+def create_session() -> aiohttp.ClientSession:
+    """Pooled session shared by all test calls"""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=30),
+        connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300),
+        headers={'user-agent': USER_AGENT},
+        skip_auto_headers={'User-Agent'}
+    )
+
+async def test_api_call(session: aiohttp.ClientSession, token):
     """Test API call with provided token"""
     headers = {
         'authorization': token,
@@ -16,8 +27,7 @@ async def test_api_call(token):
         'authority': 'portals-market.com',
         'method': 'GET',
         'path': '/api/market/actions/?offset=0&limit=5&action_types=buy',
-        'scheme': 'https',
-        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        'scheme': 'https'
     }
     
     params = {
@@ -29,35 +39,29 @@ async def test_api_call(token):
     api_url = "https://portals-market.com/api/market/actions/"
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_url,
-                params=params,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as response:
+        async with session.get(api_url, params=params, headers=headers) as response:
+            
+            print(f"Status Code: {response.status}")
+            
+            if response.status == 200:
+                data = orjson.loads(await response.read())
+                actions = data.get('actions', [])
+                print(f"✅ Success! Found {len(actions)} actions")
+                
+                if actions:
+                    print("\n📊 Sample action:")
+                    sample = actions[0]
+                    print(f"  - NFT: {sample['nft']['name']}")
+                    print(f"  - Price: {sample['amount']} TON")
+                    print(f"  - Date: {sample['created_at']}")
                 
-                print(f"Status Code: {response.status}")
+                return True
+            else:
+                error_text = await response.text()
+                print(f"❌ Error: {response.status}")
+                print(f"Response: {error_text}")
+                return False
                 
-                if response.status == 200:
-                    data = await response.json()
-                    actions = data.get('actions', [])
-                    print(f"✅ Success! Found {len(actions)} actions")
-                    
-                    if actions:
-                        print("\n📊 Sample action:")
-                        sample = actions[0]
-                        print(f"  - NFT: {sample['nft']['name']}")
-                        print(f"  - Price: {sample['amount']} TON")
-                        print(f"  - Date: {sample['created_at']}")
-                    
-                    return True
-                else:
-                    error_text = await response.text()
-                    print(f"❌ Error: {response.status}")
-                    print(f"Response: {error_text}")
-                    return False
-                    
     except Exception as e:
         print(f"💥 Request failed: {e}")
         return False
@@ -85,7 +89,10 @@ async def main():
         print("5. Look for requests to portals-market.com/api/market/actions/")
         print("6. Copy the full 'authorization' header value")
         
-        token = input("\nPaste the authorization token here: ").strip()
+        # Read stdin in a worker thread so the event loop keeps running while we wait
+        token = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: input("\nPaste the authorization token here: ").strip()
+        )
         
         if token:
             # Save token for future use
@@ -95,7 +102,8 @@ async def main():
     
     if token:
         print(f"\n🔍 Testing API call...")
-        success = await test_api_call(token)
+        async with create_session() as session:
+            success = await test_api_call(session, token)
         
         if success:
             print("\n🎉 Token is valid and working!")